@@ -0,0 +1,28 @@
+"""add_users_created_at_id_index
+
+Revision ID: 7d19c3a5e8b2
+Revises: b2c4e1f07a3d
+Create Date: 2026-10-18 08:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d19c3a5e8b2'
+down_revision: Union[str, None] = 'b2c4e1f07a3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at_id', table_name='users')
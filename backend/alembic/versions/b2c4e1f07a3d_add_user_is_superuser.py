@@ -0,0 +1,28 @@
+"""add_user_is_superuser
+
+Revision ID: b2c4e1f07a3d
+Revises: 34be8b5a94a9
+Create Date: 2026-10-18 08:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c4e1f07a3d'
+down_revision: Union[str, None] = '34be8b5a94a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'is_superuser')
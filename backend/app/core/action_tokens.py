@@ -0,0 +1,91 @@
+# backend/app/core/action_tokens.py
+"""
+Self-contained, HMAC-signed tokens for email verification and password reset
+(STATELESS_ACTION_TOKENS=true): issuing one writes nothing to the users table, and
+checking one is a signature check plus a primary-key fetch.
+
+    <base64url(json payload)>.<base64url(HMAC-SHA256)>
+
+The payload carries the user id ("uid"), purpose ("p"), expiry ("exp", Unix time)
+and a fingerprint ("fp") of the user state the token acts on: the email and
+verification flag for verification, the user's tokens_valid_after for resets
+(moved by every reset, but not by the bcrypt re-hash on login). Once the
+action is done that state changes, the fingerprint no longer matches, and the
+token is dead; no server-side record of used tokens is needed.
+
+These tokens contain a "." and random stored tokens (crud.generate_secure_token)
+never do, so both kinds can be told apart and accepted while switching modes.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+PURPOSE_EMAIL_VERIFICATION = "verify_email"
+PURPOSE_PASSWORD_RESET = "reset_password"
+
+# Domain-separated from the JWT secret, so these MACs can never be replayed as JWT signatures.
+_key = hashlib.sha256(
+    b"action-token:" + (settings.ACTION_TOKEN_SECRET_KEY or settings.JWT_SECRET_KEY).encode("utf-8")
+).digest()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _mac(data: bytes) -> bytes:
+    return hmac.new(_key, data, hashlib.sha256).digest()
+
+
+def fingerprint(purpose: str, state: str) -> str:
+    """Short keyed digest of the user state a token is bound to."""
+    return _b64encode(_mac(f"{purpose}|{state}".encode("utf-8"))[:12])
+
+
+def is_action_token(token: str) -> bool:
+    return "." in token
+
+
+def create_action_token(user_id: int, purpose: str, state: str, lifetime: timedelta) -> str:
+    payload = {
+        "uid": user_id,
+        "p": purpose,
+        "exp": int(time.time() + lifetime.total_seconds()),
+        "fp": fingerprint(purpose, state),
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return f"{body}.{_b64encode(_mac(body.encode('ascii')))}"
+
+
+def read_action_token(token: str, purpose: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the payload if the signature is valid, the purpose matches and the token
+    has not expired; otherwise None. The caller must still compare payload["fp"] with
+    fingerprint(purpose, <current user state>).
+    """
+    body, _, signature = token.partition(".")
+    try:
+        if not hmac.compare_digest(_b64decode(signature), _mac(body.encode("ascii"))):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, UnicodeError):
+        return None
+    if (
+        not isinstance(payload, dict)
+        or payload.get("p") != purpose
+        or not isinstance(payload.get("uid"), int)
+        or not isinstance(payload.get("exp"), int)
+        or payload["exp"] < time.time()
+    ):
+        return None
+    return payload
@@ -0,0 +1,60 @@
+# backend/app/core/bloom.py
+import hashlib
+import math
+from typing import Any, Dict
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. `x in f` is False only if x was never added;
+    True may be a false positive, with probability about `error_rate` while at most
+    `capacity` items have been added.
+
+    Sized with the standard formulas m = -n ln(p) / ln(2)^2 bits and k = m/n ln(2)
+    hashes; the k positions come from one 128-bit BLAKE2b digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1 # Odd, so the k positions differ
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for pos in self._positions(item):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def estimated_false_positive_rate(self) -> float:
+        # (1 - e^(-kn/m))^k for the current fill
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+            "size_bytes": len(self._bits),
+            "target_false_positive_rate": self.error_rate,
+            "estimated_false_positive_rate": round(self.estimated_false_positive_rate(), 6),
+        }
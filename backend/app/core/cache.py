@@ -0,0 +1,105 @@
+# backend/app/core/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class LRUTTLCache:
+    """
+    Bounded in-process cache with least-recently-used eviction and per-entry expiry.
+
+    Entries expire `ttl_seconds` after they are set, or at an explicit deadline
+    passed to set(). Lookups and writes are O(1). Counters for hits, misses,
+    evictions (capacity) and expirations are kept for observability.
+    A maxsize of 0 disables the cache: set() is a no-op and get() always misses.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, name: str = "cache"):
+        self.maxsize = max(0, maxsize)
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Held only for dict bookkeeping; never across I/O.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Stores value under key. `expires_at` is a time.monotonic() deadline;
+        when omitted the entry lives for the cache's ttl_seconds.
+        """
+        if self.maxsize == 0:
+            return
+        now = time.monotonic()
+        deadline = now + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Authenticated principals (detached User rows) keyed by the token subject.
+# Writers in app/users/crud.py invalidate the entry whenever they change the row;
+# other workers see the change after at most PRINCIPAL_CACHE_TTL_SECONDS.
+principal_cache = LRUTTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAXSIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    name="principal",
+)
+metrics.stats_collector(
+    "cache", principal_cache.stats,
+    counters=("hits", "misses", "evictions", "expirations"), gauges=("size", "maxsize"),
+    labels={"cache": "principal"},
+)
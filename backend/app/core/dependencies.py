@@ -1,14 +1,17 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import BaseModel # BaseModel might be needed if we were defining TokenData here
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import SessionLocal
+from app.db.database import AsyncSessionLocal
 from app.core.config import settings
+from app.core.cache import principal_cache
+from app.core.security import decode_token, REFRESH_TOKEN_TYPE
+from app.core.exceptions import ActionNotPermittedException
 from app.users.models import User
-from app.users.crud import get_user_by_username # Assuming this function exists and takes (db, username)
+from app.users.crud import get_user_by_username # Async; takes (db, username)
 from app.users.schemas import TokenData # Importing from schemas.py
+from app.users.revocation import is_token_revoked
 
 # OAuth2PasswordBearer configuration
 # The tokenUrl should match the actual login endpoint path
@@ -17,18 +20,31 @@ from app.users.schemas import TokenData # Importing from schemas.py
 # So, full path is /api/v1/auth/login
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_db():
+async def get_db():
     """
-    FastAPI dependency to provide a database session.
+    FastAPI dependency to provide an async database session.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def get_principal(db: AsyncSession, username: str) -> User | None:
+    """
+    Returns the user for a token subject, served from principal_cache when possible.
+    Cached principals are shared, detached snapshots: routes that modify the
+    user must load the row through crud, whose writers invalidate the entry.
+    """
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    user = await get_user_by_username(db, username=username)
+    if user is None:
+        return None
+    db.expunge(user)
+    principal_cache.set(username, user)
+    return user
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     FastAPI dependency to get the current user from a JWT token.
@@ -38,21 +54,23 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        username: str | None = payload.get("sub")
-        if username is None:
-            # According to JWT spec, "sub" (subject) is the standard claim for principal identifier
-            raise credentials_exception
-        # TokenData validation can be implicitly handled by checking username presence
-        # token_data = TokenData(username=username) # Not strictly necessary if only username is used from payload
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None:
         raise credentials_exception
-    
-    user = get_user_by_username(db, username=username)
-    if user is None:
+    username: str | None = payload.get("sub")
+    if username is None:
+        # According to JWT spec, "sub" (subject) is the standard claim for principal identifier
+        raise credentials_exception
+    # TokenData validation can be implicitly handled by checking username presence
+    # token_data = TokenData(username=username) # Not strictly necessary if only username is used from payload
+
+    if payload.get("type") == REFRESH_TOKEN_TYPE:
+        # Refresh tokens are only accepted by /auth/refresh
+        raise credentials_exception
+
+    user = await get_principal(db, username)
+    # Logged-out / admin-revoked jti, or issued before a password reset; no query either way
+    if user is None or is_token_revoked(payload, user):
         raise credentials_exception
     return user
 
@@ -66,3 +84,13 @@ async def get_current_active_user(
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
+
+async def get_current_superuser(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    """
+    FastAPI dependency for the /admin endpoints: an active user with is_superuser set.
+    """
+    if not current_user.is_superuser:
+        raise ActionNotPermittedException(detail="Superuser privileges required")
+    return current_user
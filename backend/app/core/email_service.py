@@ -1,26 +1,88 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+
 from pydantic import EmailStr
 from typing import List, Dict 
 from pathlib import Path
 
+from app.core import metrics
 from app.core.config import settings # Your application settings
+from app.core.smtp_pool import SMTPConnectionPool
+
+# fastapi-mail (and its jinja2 import) is loaded on the first send rather than at import:
+# only the outbox worker sends mail, and with the SMTP pool it may never need FastMail.
+_fast_mail = None
+
+def get_fast_mail():
+    global _fast_mail
+    if _fast_mail is None:
+        from fastapi_mail import ConnectionConfig, FastMail
+        conf = ConnectionConfig(
+            MAIL_USERNAME=settings.MAIL_USERNAME,
+            MAIL_PASSWORD=settings.MAIL_PASSWORD,
+            MAIL_FROM=settings.MAIL_FROM,
+            MAIL_PORT=settings.MAIL_PORT,
+            MAIL_SERVER=settings.MAIL_SERVER,
+            MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
+            MAIL_STARTTLS=settings.MAIL_STARTTLS,
+            MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+            USE_CREDENTIALS=settings.USE_CREDENTIALS,
+            VALIDATE_CERTS=settings.VALIDATE_CERTS,
+            # TEMPLATE_FOLDER=Path(__file__).parent / 'templates' / 'email', # Optional: if using .html templates
+            # For now, let's not assume a template folder structure unless specifically created
+        )
+        _fast_mail = FastMail(conf)
+    return _fast_mail
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.MAIL_PORT,
-    MAIL_SERVER=settings.MAIL_SERVER,
-    MAIL_FROM_NAME=settings.MAIL_FROM_NAME,
-    MAIL_STARTTLS=settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS,
-    # TEMPLATE_FOLDER=Path(__file__).parent / 'templates' / 'email', # Optional: if using .html templates
-    # For now, let's not assume a template folder structure unless specifically created
+logger = logging.getLogger(__name__)
+
+# Persistent, authenticated SMTP sessions reused across messages (MAIL_SMTP_POOL_SIZE=0 disables
+# the pool and sends every message through FastMail, one connection per message).
+_smtp_pool: SMTPConnectionPool | None = None
+
+EMAIL_SENDS = metrics.counter("email_sends", "Email send attempts by result", ("result",))
+EMAIL_SEND_SECONDS = metrics.histogram("email_send_duration_seconds", "Time to hand one email to the SMTP server", ("result",))
+for _result in ("success", "failure"): # Export both series from the start, at zero
+    EMAIL_SENDS.labels(_result)
+    EMAIL_SEND_SECONDS.labels(_result)
+metrics.stats_collector(
+    "smtp_pool", lambda: _smtp_pool.stats() if _smtp_pool is not None else None,
+    counters=("connections_opened", "connections_closed", "messages_sent", "send_failures", "reconnects"),
+    gauges=("size", "idle"),
 )
 
-fm = FastMail(conf)
+def get_smtp_pool() -> SMTPConnectionPool | None:
+    global _smtp_pool
+    if settings.MAIL_SMTP_POOL_SIZE <= 0:
+        return None
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            username=settings.MAIL_USERNAME if settings.USE_CREDENTIALS else None,
+            password=settings.MAIL_PASSWORD if settings.USE_CREDENTIALS else None,
+            use_tls=settings.MAIL_SSL_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            validate_certs=settings.VALIDATE_CERTS,
+            size=settings.MAIL_SMTP_POOL_SIZE,
+            max_messages_per_connection=settings.MAIL_SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+            max_idle_seconds=settings.MAIL_SMTP_POOL_MAX_IDLE_SECONDS,
+        )
+    return _smtp_pool
+
+async def close_smtp_pool() -> None:
+    if _smtp_pool is not None:
+        await _smtp_pool.close()
+
+def build_email_message(recipients: List[str], subject: str, body: str, subtype: str = "html") -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body, subtype=subtype)
+    return message
 
 async def send_email(
     recipients: List[EmailStr],
@@ -43,39 +105,55 @@ async def send_email(
         # If only console output is desired for testing and no actual email sending:
         # return # Uncomment this line if you want to prevent actual email sending during console output mode
 
+    # Template rendering needs FastMail's TEMPLATE_FOLDER; only then is FastMail built up front
+    use_template = bool(template_name) and bool(get_fast_mail().config.TEMPLATE_FOLDER)
+
     # Determine message content and subtype
     message_text_content: str | None = None
-    if template_name and conf.TEMPLATE_FOLDER and template_body:
+    if use_template and template_body:
         # This case is for when using fastapi-mail's template rendering
         # The 'body' field of MessageSchema will be the context dict for the template
         message_data_for_schema = template_body
-        message_subtype = MessageType.html # Assuming templates are HTML
+        message_subtype = "html" # Assuming templates are HTML
     elif html_body:
         message_data_for_schema = html_body
-        message_subtype = MessageType.html
+        message_subtype = "html"
     else:
         # Fallback to a very plain text body if nothing else is provided
         message_text_content = "This is a plain text email body if no html_body or template is provided."
         message_data_for_schema = message_text_content
-        message_subtype = MessageType.plain
-        
-    message = MessageSchema(
-        subject=subject,
-        recipients=recipients,
-        body=message_data_for_schema, # This is either HTML string or context dict for template
-        subtype=message_subtype,
-    )
+        message_subtype = "plain"
+
+    def fast_mail_message():
+        from fastapi_mail import MessageSchema, MessageType
+        return MessageSchema(
+            subject=subject,
+            recipients=recipients,
+            body=message_data_for_schema, # This is either HTML string or context dict for template
+            subtype=MessageType(message_subtype),
+        )
 
+    smtp_pool = get_smtp_pool()
+    started = time.perf_counter()
     try:
-        if template_name and conf.TEMPLATE_FOLDER: # Check if template rendering is intended
-            await fm.send_message(message, template_name=template_name)
+        if use_template: # Check if template rendering is intended
+            await get_fast_mail().send_message(fast_mail_message(), template_name=template_name)
+        elif smtp_pool is not None:
+            await smtp_pool.send(
+                build_email_message(recipients, subject, message_data_for_schema, subtype=message_subtype)
+            )
         else:
             # If not using templates or TEMPLATE_FOLDER is not set, send as is (html or plain)
-            await fm.send_message(message)
+            await get_fast_mail().send_message(fast_mail_message())
         # print(f"Email sent to {', '.join(recipients)} with subject: {subject}") # Optional success log
     except Exception as e:
-        print(f"Error sending email via fastapi-mail: {e}")
-        # In a real app, you might want to raise an exception or handle this more gracefully
+        EMAIL_SENDS.labels("failure").inc()
+        EMAIL_SEND_SECONDS.labels("failure").observe(time.perf_counter() - started)
+        # Re-raised so the outbox worker can retry the message with backoff
+        logger.warning("Error sending email to %s: %s", ", ".join(recipients), e)
+        raise
+    EMAIL_SENDS.labels("success").inc()
+    EMAIL_SEND_SECONDS.labels("success").observe(time.perf_counter() - started)
 
 async def send_password_reset_email(recipient_email: EmailStr, username: str, token: str):
     subject = f"{settings.MAIL_FROM_NAME} - Password Reset Request"
@@ -44,6 +44,14 @@ class ActionNotPermittedException(DetailedHTTPException):
     def __init__(self, detail: str = "Action not permitted"):
         super().__init__(status_code=403, detail=detail)
 
+class TooManyRequestsException(DetailedHTTPException):
+    def __init__(self, detail: str = "Too many requests, please retry later.", retry_after: int = 1):
+        super().__init__(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class ServiceUnavailableException(DetailedHTTPException):
+    def __init__(self, detail: str = "Service temporarily unavailable, please retry.", retry_after: int = 1):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
+
 
 # Add more specific exceptions as needed, for example:
 class EmailVerificationTokenInvalid(DetailedHTTPException):
@@ -57,3 +65,11 @@ class PasswordResetTokenInvalid(DetailedHTTPException):
 class UserAlreadyVerifiedException(DetailedHTTPException):
     def __init__(self, detail: str = "User email is already verified."):
         super().__init__(status_code=400, detail=detail)
+
+class InvalidPaginationCursor(DetailedHTTPException):
+    def __init__(self, detail: str = "Invalid pagination cursor."):
+        super().__init__(status_code=400, detail=detail)
+
+class PasswordHashingUnavailable(ServiceUnavailableException):
+    def __init__(self, detail: str = "Authentication service is busy, please retry."):
+        super().__init__(detail=detail)
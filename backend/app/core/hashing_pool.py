@@ -0,0 +1,170 @@
+# backend/app/core/hashing_pool.py
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core import metrics
+from app.core.exceptions import PasswordHashingUnavailable
+
+T = TypeVar("T")
+
+# Number of recent latencies kept for percentile reporting.
+LATENCY_WINDOW = 1024
+
+
+# Labelled by the job function, e.g. op="verify_password" / op="get_password_hash".
+PASSWORD_HASH_SECONDS = metrics.histogram(
+    "password_hash_duration_seconds", "Time a password hashing job ran on the executor", ("op",),
+)
+PASSWORD_HASH_WAIT_SECONDS = metrics.histogram(
+    "password_hash_wait_seconds", "Time a password hashing job waited for a free worker", ("op",),
+)
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class PasswordHashingPool:
+    """
+    Runs CPU-heavy password work (bcrypt hash/verify) on a dedicated executor.
+
+    At most `max_workers` jobs run at once; up to `max_queue` more may wait for a slot.
+    A job that finds the queue full, or waits longer than `max_wait_seconds`, is shed
+    with PasswordHashingUnavailable (503) instead of piling up behind the burst.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 64,
+        max_wait_seconds: float = 2.0,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor kind: {kind!r}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_seconds = max_wait_seconds
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Counters; only touched from the event loop thread.
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_times: deque = deque(maxlen=LATENCY_WINDOW)
+        self._run_times: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Runs fn(*args) on the pool. Raises PasswordHashingUnavailable when the job is shed.
+        With the process executor, fn and args must be picklable (module-level functions).
+        """
+        slots = self._get_slots()
+        enqueued_at = time.perf_counter()
+        if not slots.locked():
+            # A worker slot is free: acquire() returns without suspending.
+            await slots.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise PasswordHashingUnavailable()
+            self._waiting += 1
+            try:
+                # asyncio.timeout cancels acquire() itself, which hands a permit granted
+                # at the deadline on to the next waiter; wait_for could drop it.
+                async with asyncio.timeout(self.max_wait_seconds):
+                    await slots.acquire()
+            except TimeoutError:
+                self._timed_out += 1
+                raise PasswordHashingUnavailable()
+            finally:
+                self._waiting -= 1
+
+        started_at = time.perf_counter()
+        op = getattr(fn, "__name__", "job")
+        self._wait_times.append(started_at - enqueued_at)
+        PASSWORD_HASH_WAIT_SECONDS.labels(op).observe(started_at - enqueued_at)
+        self._in_flight += 1
+        loop = asyncio.get_running_loop()
+
+        def finished() -> None:
+            self._in_flight -= 1
+            slots.release()
+            self._completed += 1
+            run_time = time.perf_counter() - started_at
+            self._run_times.append(run_time)
+            PASSWORD_HASH_SECONDS.labels(op).observe(run_time)
+
+        def on_done(_future) -> None:
+            # Runs when the job has actually stopped, not when the caller gave up on it
+            # (a cancelled request leaves bcrypt running on the worker).
+            try:
+                loop.call_soon_threadsafe(finished)
+            except RuntimeError: # Loop already closed at shutdown
+                pass
+
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except BaseException: # e.g. the executor was shut down
+            finished()
+            raise
+        job.add_done_callback(on_done)
+        return await asyncio.wrap_future(job)
+
+    def has_idle_worker(self) -> bool:
+        """True when a job submitted now would start at once instead of queueing."""
+        return not self._get_slots().locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth, counters and latency percentiles (seconds).
+        """
+        wait_times = list(self._wait_times)
+        run_times = list(self._run_times)
+        return {
+            "executor": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._waiting,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "wait_p50": _percentile(wait_times, 50),
+            "wait_p99": _percentile(wait_times, 99),
+            "run_p50": _percentile(run_times, 50),
+            "run_p95": _percentile(run_times, 95),
+            "run_p99": _percentile(run_times, 99),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
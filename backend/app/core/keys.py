@@ -0,0 +1,230 @@
+# backend/app/core/keys.py
+"""
+Asymmetric JWT signing keys and the JWKS document published for other services.
+
+Keys live as PEM files in JWT_KEYS_DIR, one per key, named `<kid>.pem`:
+- a private key can sign and verify; a public key can only verify.
+- the signing key is JWT_ACTIVE_KID, or, if unset, the greatest kid that has a private key.
+- each key's alg follows from its type: ES256/384/512 by curve; RSA keys use
+  JWT_ALGORITHM if it is an RS* algorithm, else RS256. So a ring can rotate from
+  RSA to ECDSA (or back) by adding a key of the new type. Files holding other key
+  types or curves are skipped.
+- every key in the directory is published at /.well-known/jwks.json.
+
+Rotation with overlap: add the new key file (it is published on the next reload),
+make it active, and delete the old file only once tokens it signed have expired.
+The directory is re-read every JWT_KEYS_RELOAD_SECONDS on a background thread, so
+no restart is needed and requests never wait for it (only the very first load is
+synchronous). A file that cannot be parsed is skipped with a logged error; a key
+that loaded before keeps being used under its kid.
+
+Generate a key:
+    python -m app.core.keys generate --kid 2026-10 --algorithm RS256 --dir ./keys
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+
+logger = logging.getLogger(__name__)
+
+# python-jose has no EdDSA support, so RSA and ECDSA are the asymmetric options.
+SUPPORTED_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512")
+_EC_CURVES = {"ES256": ec.SECP256R1, "ES384": ec.SECP384R1, "ES512": ec.SECP521R1}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm in SUPPORTED_ALGORITHMS
+
+
+class SigningKey:
+    def __init__(self, kid: str, algorithm: str, public_pem: str, private_pem: Optional[str] = None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_pem = public_pem
+        self.private_pem = private_pem
+
+    @property
+    def can_sign(self) -> bool:
+        return self.private_pem is not None
+
+    def to_jwk(self) -> Dict[str, Any]:
+        data = jwk.construct(self.public_pem, self.algorithm).to_dict()
+        data.update({"kid": self.kid, "use": "sig"})
+        return data
+
+
+def key_algorithm(public_key: Any, configured: str) -> str:
+    """
+    The JWS alg a key can be used with, from its type: ES256/384/512 by curve, and for
+    RSA the configured RS* algorithm (RS256 if the ring is configured for ECDSA).
+    Raises ValueError for key types and curves JWT signing here does not support.
+    """
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return configured if configured.startswith("RS") else "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        for algorithm, curve in _EC_CURVES.items():
+            if isinstance(public_key.curve, curve):
+                return algorithm
+        raise ValueError(f"unsupported EC curve {public_key.curve.name}")
+    raise ValueError(f"unsupported key type {type(public_key).__name__}")
+
+
+def _load_key_file(path: Path, configured_algorithm: str) -> SigningKey:
+    data = path.read_bytes()
+    kid = path.stem
+    if b"PRIVATE KEY" in data:
+        private_key = serialization.load_pem_private_key(data, password=None)
+        public_key = private_key.public_key()
+        public_pem = public_key.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        algorithm = key_algorithm(public_key, configured_algorithm)
+        return SigningKey(kid, algorithm, public_pem, private_pem=data.decode())
+    public_key = serialization.load_pem_public_key(data) # Fail early on malformed files
+    return SigningKey(kid, key_algorithm(public_key, configured_algorithm), data.decode())
+
+
+class KeyRing:
+    """
+    The set of keys in a directory, reloaded at most every `reload_seconds`.
+    Reloads after the first run on a background thread; callers see the previous
+    keys until it finishes.
+    """
+
+    def __init__(self, keys_dir: str, algorithm: str, active_kid: str = "", reload_seconds: float = 60.0):
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        self.reload_seconds = reload_seconds
+        self._keys: Dict[str, SigningKey] = {}
+        self._jwks: Dict[str, Any] = {"keys": []}
+        self._loaded_at: Optional[float] = None
+        self._reload_started_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def reload(self) -> None:
+        previous = self._keys
+        keys: Dict[str, SigningKey] = {}
+        jwks: List[Dict[str, Any]] = []
+        if self.keys_dir is not None and self.keys_dir.is_dir():
+            for path in sorted(self.keys_dir.glob("*.pem")):
+                try:
+                    key = _load_key_file(path, self.algorithm)
+                    jwk_data = key.to_jwk()
+                except Exception as e: # One bad file must not take the other keys down
+                    key = previous.get(path.stem)
+                    logger.error("Skipping JWT key file %s: %s%s", path, e,
+                                 " (keeping the previously loaded key)" if key is not None else "")
+                    if key is None:
+                        continue
+                    jwk_data = key.to_jwk()
+                keys[key.kid] = key
+                jwks.append(jwk_data)
+        with self._lock:
+            self._keys = keys
+            self._jwks = {"keys": jwks}
+            self._loaded_at = time.monotonic()
+
+    def _reload_in_background(self) -> None:
+        """Starts one reload thread unless one is running or started within the last second."""
+        with self._lock:
+            now = time.monotonic()
+            if self._reloading or now - self._reload_started_at < 1.0:
+                return
+            self._reloading = True
+            self._reload_started_at = now
+
+        def run() -> None:
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Reloading JWT keys from %s failed; keeping the current keys", self.keys_dir)
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, name="jwt-key-reload", daemon=True).start()
+
+    def _ensure_fresh(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            self.reload() # Nothing to serve from yet
+        elif time.monotonic() - loaded_at >= self.reload_seconds:
+            self._reload_in_background()
+
+    def signing_key(self) -> SigningKey:
+        self._ensure_fresh()
+        keys = self._keys
+        if self.active_kid:
+            key = keys.get(self.active_kid)
+        else:
+            signers = [kid for kid, key in keys.items() if key.can_sign]
+            key = keys[max(signers)] if signers else None
+        if key is None or not key.can_sign:
+            raise RuntimeError(
+                f"No private signing key available in {self.keys_dir} (active kid: {self.active_kid or 'auto'})"
+            )
+        return key
+
+    def verification_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+        if kid is None:
+            return None
+        self._ensure_fresh()
+        key = self._keys.get(kid)
+        if key is None:
+            # Unknown kid: rejected now, but a peer may have rotated before our next
+            # scheduled reload, so look again without holding up this request.
+            self._reload_in_background()
+        return key
+
+    def jwks(self) -> Dict[str, Any]:
+        self._ensure_fresh()
+        return self._jwks
+
+
+def generate_key_file(keys_dir: str, kid: str, algorithm: str = "RS256") -> Path:
+    """
+    Writes a new private key to `<keys_dir>/<kid>.pem` (mode 0600) and returns the path.
+    """
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm in _EC_CURVES:
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm]())
+    else:
+        raise ValueError(f"Unsupported algorithm {algorithm!r}; choose one of {', '.join(SUPPORTED_ALGORITHMS)}")
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    directory = Path(keys_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{kid}.pem"
+    if path.exists():
+        raise FileExistsError(f"{path} already exists")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="Generate a new private signing key")
+    gen.add_argument("--kid", required=True, help="Key id; also the file name")
+    gen.add_argument("--algorithm", default="RS256", choices=SUPPORTED_ALGORITHMS)
+    gen.add_argument("--dir", default=os.getenv("JWT_KEYS_DIR", "keys"))
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        print(generate_key_file(args.dir, args.kid, args.algorithm))
+
+
+if __name__ == "__main__":
+    main()
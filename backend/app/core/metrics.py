@@ -0,0 +1,396 @@
+# backend/app/core/metrics.py
+"""
+In-process metrics rendered in the Prometheus text exposition format (GET /metrics).
+
+Instrumented code owns its metrics and creates them with counter()/histogram()
+at import time; labelled children are created on first use and then reused, so
+recording a sample is a dict lookup plus a few integer/float additions. There are
+no locks: request-path updates happen on the event loop thread, and the rare
+lost increment from a concurrent executor thread is acceptable for monitoring.
+
+Subsystems that already keep their own counters (caches, pools, the rate limiter)
+are exported at scrape time through add_collector()/stats_collector() instead of
+being counted twice.
+
+Each worker process has its own registry; scrape every worker (or run one per pod).
+"""
+import bisect
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Seconds; suits everything from a cache hit to a slow bcrypt verify or SMTP send.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Queries issued by one request.
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Family(NamedTuple):
+    name: str
+    kind: str # "counter", "gauge" or "histogram"
+    help: str
+    # (name suffix, label pairs, value), e.g. ("_bucket", (("route", "/x"), ("le", "0.1")), 3)
+    samples: List[Tuple[str, Tuple[Tuple[str, str], ...], float]]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Returns the child for these label values (in labelnames order), creating it once."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_pairs(self, values: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def collect(self) -> Family:
+        return Family(self.name + "_total", self.kind, self.help, [
+            ("", self._label_pairs(values), child.value) for values, child in list(self._children.items())
+        ])
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def collect(self) -> Family:
+        samples = []
+        for values, child in list(self._children.items()):
+            samples.extend(histogram_samples(self._label_pairs(values), self.buckets, list(child.counts), child.sum))
+        return Family(self.name, self.kind, self.help, samples)
+
+
+def histogram_samples(labels, bounds: Sequence[float], counts: Sequence[int], total: float) -> list:
+    """Samples for one histogram series from per-bucket (non-cumulative) counts; len(counts) == len(bounds) + 1."""
+    samples, running = [], 0
+    for bound, count in zip(list(bounds) + [math.inf], counts):
+        running += count
+        samples.append(("_bucket", labels + (("le", _format_value(bound)),), running))
+    samples.append(("_sum", labels, total))
+    samples.append(("_count", labels, running))
+    return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Registers a callable run on every scrape; it returns Family tuples."""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[Family]:
+        # Families with the same name (e.g. one cache collector per cache) are merged.
+        merged: Dict[str, Family] = {}
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        for family in families:
+            existing = merged.get(family.name)
+            if existing is None:
+                merged[family.name] = Family(family.name, family.kind, family.help, list(family.samples))
+            else:
+                existing.samples.extend(family.samples)
+        return list(merged.values())
+
+    def render(self) -> str:
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in family.samples:
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels)
+                    lines.append(f"{family.name}{suffix}{{{rendered}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{family.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Creates and registers a counter; `name` is given without the _total suffix."""
+    return registry.register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+def stats_collector(
+    prefix: str,
+    stats: Callable[[], Optional[Dict[str, Any]]],
+    counters: Sequence[str] = (),
+    gauges: Sequence[str] = (),
+    labels: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Exports numeric keys of an existing stats() dict on every scrape: each key in
+    `counters` as <prefix>_<key>_total, each key in `gauges` as <prefix>_<key>.
+    `stats` may return None when the subsystem is not running.
+    """
+    label_pairs = tuple((labels or {}).items())
+
+    def collect() -> Iterable[Family]:
+        snapshot = stats()
+        if not snapshot:
+            return []
+        families = []
+        for kind, keys in (("counter", counters), ("gauge", gauges)):
+            for key in keys:
+                value = snapshot.get(key)
+                if isinstance(value, (int, float)):
+                    name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+                    families.append(Family(name, kind, f"{key} ({prefix} stats)", [("", label_pairs, value)]))
+        return families
+
+    registry.add_collector(collect)
+
+
+# --- HTTP requests -----------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Time from receiving the request to the end of the response body",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DB_QUERIES = histogram(
+    "http_request_db_queries", "SQL statements executed while serving one request", ("route",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_REQUEST_DB_SECONDS = histogram(
+    "http_request_db_seconds", "Time spent in SQL statements while serving one request", ("route",),
+)
+_http_in_progress = [0]
+registry.add_collector(lambda: [Family(
+    "http_requests_in_progress", "gauge", "Requests currently being served", [("", (), _http_in_progress[0])],
+)])
+
+# [statement count, seconds] of the request being served; None outside requests.
+_request_db_usage: ContextVar[Optional[List[float]]] = ContextVar("request_db_usage", default=None)
+
+# Route label for requests that matched no route (404s), so scans cannot blow up cardinality.
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# endpoint -> path template, rebuilt when the application's route count changes
+_route_templates: Dict[Any, str] = {}
+_routes_seen = [-1]
+
+
+def route_template(scope) -> str:
+    """
+    The matched route's path template ("/api/v1/users/{user_id}") for an ASGI scope,
+    or UNMATCHED_ROUTE. Valid once the router has run (it sets scope["endpoint"]).
+    """
+    global _route_templates
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    template = _route_templates.get(endpoint)
+    if template is None:
+        routes = getattr(scope.get("app"), "routes", [])
+        if len(routes) != _routes_seen[0]:
+            _routes_seen[0] = len(routes)
+            _route_templates = {
+                route.endpoint: getattr(route, "path_format", route.path)
+                for route in routes if hasattr(route, "endpoint")
+            }
+        template = _route_templates.get(endpoint, UNMATCHED_ROUTE)
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or body buffering, unlike BaseHTTPMiddleware)
+    recording latency per route template and status, and the request's SQL usage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500] # Reported if the app raises before starting a response
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        usage = [0, 0.0]
+        token = _request_db_usage.set(usage)
+        _http_in_progress[0] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _http_in_progress[0] -= 1
+            _request_db_usage.reset(token)
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(elapsed)
+            HTTP_REQUEST_DB_QUERIES.labels(route).observe(usage[0])
+            HTTP_REQUEST_DB_SECONDS.labels(route).observe(usage[1])
+
+
+# --- Database ------------------------------------------------------------------------
+
+DB_QUERY_SECONDS = histogram("db_query_duration_seconds", "SQL statement execution time", ("engine",))
+
+
+def instrument_engine_queries(sync_engine) -> None:
+    """
+    Times every statement on an Engine (for an AsyncEngine pass `async_engine.sync_engine`)
+    and charges it to the request being served, if any. SQLAlchemy runs async engine
+    events in a greenlet that shares the caller's context, so the ContextVar is visible.
+    """
+    histogram_child = DB_QUERY_SECONDS.labels(sync_engine.pool._orig_logging_name or "default")
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("metrics_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        histogram_child.observe(elapsed)
+        usage = _request_db_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+
+def _pool_families() -> Iterable[Family]:
+    # Imported here: app.db imports this module to instrument its engines.
+    from app.db.pool_stats import get_pool_stats
+
+    gauges = {
+        "size": "Configured pool size",
+        "checked_out": "Connections currently checked out",
+        "checked_in": "Idle connections in the pool",
+        "overflow": "Connections open beyond pool_size",
+    }
+    counters = {
+        "connects": "New DBAPI connections opened",
+        "checkouts": "Connection checkouts",
+        "timeouts": "Checkouts that gave up after pool_timeout",
+        "invalidations": "Connections invalidated",
+    }
+    families: Dict[str, Family] = {}
+    for name, snapshot in get_pool_stats().items():
+        labels = (("pool", name),)
+        for key, help in gauges.items():
+            if key in snapshot:
+                families.setdefault(key, Family(f"db_pool_{key}", "gauge", help, [])).samples.append(
+                    ("", labels, snapshot[key]))
+        for key, help in counters.items():
+            families.setdefault(key + "_total", Family(f"db_pool_{key}_total", "counter", help, [])).samples.append(
+                ("", labels, snapshot[key]))
+        wait = snapshot["wait_time"]
+        per_bucket = [count - previous for count, previous in zip(wait["cumulative_counts"], [0] + wait["cumulative_counts"][:-1])]
+        families.setdefault("wait", Family(
+            "db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection", [],
+        )).samples.extend(histogram_samples(labels, wait["buckets"][:-1], per_bucket, wait["sum"]))
+    return families.values()
+
+
+registry.add_collector(_pool_families)
+
+
+def render_metrics() -> str:
+    return registry.render()
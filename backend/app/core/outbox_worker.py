@@ -0,0 +1,231 @@
+# backend/app/core/outbox_worker.py
+"""
+Drains the email outbox. Run one or more alongside the API:
+
+    python -m app.core.outbox_worker            # loop forever
+    python -m app.core.outbox_worker --once     # drain what is due, then exit
+
+Each iteration claims up to EMAIL_OUTBOX_BATCH_SIZE due rows in a single
+UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING statement,
+which leases them for EMAIL_OUTBOX_LEASE_SECONDS, so concurrent workers never
+claim the same row. Failed sends are retried with exponential backoff; after
+EMAIL_OUTBOX_MAX_ATTEMPTS the row is marked dead. Sent and dead rows have their
+payload (which carries the plaintext token) cleared, and are deleted after
+EMAIL_OUTBOX_RETENTION_DAYS.
+
+Without a running worker (or EMAIL_OUTBOX_IN_PROCESS_WORKER), mail stays queued.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.email_service import close_smtp_pool, send_email_verification_email, send_password_reset_email
+from app.db.database import AsyncSessionLocal, dispose_engines
+from app.users import crud
+from app.users.models import EmailOutbox
+from app.users.crud import utcnow
+
+logger = logging.getLogger(__name__)
+
+# How often the worker deletes expired sent/dead rows
+PRUNE_INTERVAL_SECONDS = 3600
+
+# Outbox kind -> coroutine taking (recipient_email, **payload)
+EMAIL_SENDERS: Dict[str, Callable[..., Awaitable[None]]] = {
+    crud.EMAIL_KIND_VERIFICATION: send_email_verification_email,
+    crud.EMAIL_KIND_PASSWORD_RESET: send_password_reset_email,
+}
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at EMAIL_OUTBOX_BACKOFF_MAX_SECONDS."""
+    ceiling = min(
+        settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+        settings.EMAIL_OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)),
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+async def claim_batch(db: AsyncSession, batch_size: int, lease_seconds: int) -> List[EmailOutbox]:
+    now = utcnow()
+    due_ids = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True) # Ignored by SQLite, whose writers are serialised anyway
+    )
+    result = await db.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id.in_(due_ids),
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .values(
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+            attempts=EmailOutbox.attempts + 1,
+        )
+        .returning(EmailOutbox)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = list(result.scalars().all())
+    await db.commit()
+    return claimed
+
+
+async def _send(message: EmailOutbox, limiter: asyncio.Semaphore) -> Optional[str]:
+    """Returns None on success, or the error text."""
+    sender = EMAIL_SENDERS.get(message.kind)
+    if sender is None:
+        return f"Unknown outbox kind {message.kind!r}"
+    async with limiter:
+        try:
+            await sender(recipient_email=message.recipient, **message.payload)
+        except Exception as e: # Any transport/SMTP failure is retried
+            return f"{type(e).__name__}: {e}"[:1000]
+    return None
+
+
+async def process_batch(db: AsyncSession, messages: List[EmailOutbox]) -> Tuple[int, int, int]:
+    """
+    Sends a claimed batch and records the outcome. Returns (sent, retried, dead).
+    """
+    # Sends share the pooled SMTP connections (MAIL_SMTP_POOL_SIZE); the limiter caps
+    # how many are in flight at once.
+    limiter = asyncio.Semaphore(settings.EMAIL_OUTBOX_SEND_CONCURRENCY)
+    errors = await asyncio.gather(*(_send(message, limiter) for message in messages))
+
+    now = utcnow()
+    sent_ids = [m.id for m, error in zip(messages, errors) if error is None]
+    if sent_ids:
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=now, last_error=None, payload={})
+            .execution_options(synchronize_session=False)
+        )
+    retried = dead = 0
+    for message, error in zip(messages, errors):
+        if error is None:
+            continue
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            values = {"status": "dead", "last_error": error, "payload": {}}
+            dead += 1
+            logger.error("Outbox message %s to %s is dead after %s attempts: %s",
+                         message.id, message.recipient, message.attempts, error)
+        else:
+            values = {"next_attempt_at": now + timedelta(seconds=backoff_seconds(message.attempts)), "last_error": error}
+            retried += 1
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == message.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return len(sent_ids), retried, dead
+
+
+async def pending_count(db: AsyncSession) -> int:
+    result = await db.execute(select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == "pending"))
+    return result.scalar_one()
+
+
+async def prune_finished(db: AsyncSession, retention_days: float) -> int:
+    """Deletes sent and dead rows created more than retention_days ago."""
+    result = await db.execute(
+        delete(EmailOutbox)
+        .where(
+            EmailOutbox.status.in_(("sent", "dead")),
+            EmailOutbox.created_at < utcnow() - timedelta(days=retention_days),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def run_worker(
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    once: bool = False,
+    stop_event: Optional[asyncio.Event] = None,
+) -> None:
+    """
+    Claims and sends batches until stopped (or, with once=True, until nothing is due).
+    Logs throughput every EMAIL_OUTBOX_REPORT_SECONDS and prunes old rows
+    every PRUNE_INTERVAL_SECONDS.
+    """
+    stop_event = stop_event or asyncio.Event()
+    totals = {"sent": 0, "retried": 0, "dead": 0}
+    window = {"sent": 0, "started": time.monotonic()}
+    last_pruned = None
+
+    while not stop_event.is_set():
+        try:
+            async with session_factory() as db:
+                batch = await claim_batch(db, settings.EMAIL_OUTBOX_BATCH_SIZE, settings.EMAIL_OUTBOX_LEASE_SECONDS)
+                if batch:
+                    sent, retried, dead = await process_batch(db, batch)
+                    totals["sent"] += sent
+                    totals["retried"] += retried
+                    totals["dead"] += dead
+                    window["sent"] += sent
+
+                elapsed = time.monotonic() - window["started"]
+                if elapsed >= settings.EMAIL_OUTBOX_REPORT_SECONDS or (once and not batch):
+                    logger.info(
+                        "Outbox: %.1f msg/s over %.0fs; totals sent=%d retried=%d dead=%d; pending=%d",
+                        window["sent"] / elapsed if elapsed else 0.0, elapsed,
+                        totals["sent"], totals["retried"], totals["dead"], await pending_count(db),
+                    )
+                    window = {"sent": 0, "started": time.monotonic()}
+
+                if settings.EMAIL_OUTBOX_RETENTION_DAYS > 0 and (
+                    last_pruned is None or time.monotonic() - last_pruned >= PRUNE_INTERVAL_SECONDS
+                ):
+                    last_pruned = time.monotonic()
+                    pruned = await prune_finished(db, settings.EMAIL_OUTBOX_RETENTION_DAYS)
+                    if pruned:
+                        logger.info("Outbox: deleted %d sent/dead rows older than %s days",
+                                    pruned, settings.EMAIL_OUTBOX_RETENTION_DAYS)
+        except Exception:
+            logger.exception("Outbox worker iteration failed")
+            batch = []
+
+        if once and not batch:
+            return
+        if len(batch) < settings.EMAIL_OUTBOX_BATCH_SIZE:
+            # Caught up: wait for new rows (or for stop) instead of spinning.
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deliver queued emails from the outbox table.")
+    parser.add_argument("--once", action="store_true", help="Drain everything currently due, then exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    async def _run() -> None:
+        try:
+            await run_worker(once=args.once)
+        finally:
+            await close_smtp_pool()
+            await dispose_engines()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
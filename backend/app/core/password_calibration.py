@@ -0,0 +1,96 @@
+# backend/app/core/password_calibration.py
+"""
+Picks the bcrypt cost (PASSWORD_BCRYPT_ROUNDS) that fits a per-verify latency
+budget on this machine. Run it on production hardware, from backend/:
+
+    python -m app.core.password_calibration --budget-ms 250
+    python -m app.core.password_calibration --budget-ms 250 --threads 4 --json
+
+Costs are tried from --min-rounds upward, and a verify is timed at each. Every
+round doubles the work, so the run stops at the first cost over budget. The
+reported time is the median of --samples verifies. With --threads N, N verifies
+run concurrently, as with PASSWORD_HASH_WORKERS=N on a busy instance. Shared
+cores and turbo limits make that slower than a lone verify.
+
+Changing the setting takes effect on new hashes right away. Existing hashes move to
+the new cost as their users log in (PASSWORD_REHASH_ON_LOGIN), without a reset.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+# The OWASP floor for bcrypt; the tool warns when the budget only allows less
+RECOMMENDED_MIN_ROUNDS = 10
+
+
+def time_verify(rounds: int, samples: int, threads: int = 1) -> float:
+    """Median seconds per bcrypt verify at `rounds`, with `threads` verifies in parallel."""
+    from passlib.hash import bcrypt
+
+    secret = "calibration-Password-1"
+    hashed = bcrypt.using(rounds=rounds).hash(secret)
+    bcrypt.verify(secret, hashed) # Warm-up (backend selection)
+
+    def one() -> float:
+        started = time.perf_counter()
+        bcrypt.verify(secret, hashed)
+        return time.perf_counter() - started
+
+    timings: List[float] = []
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(samples):
+            timings.extend(pool.map(lambda _: one(), range(threads)))
+    return statistics.median(timings)
+
+
+def calibrate(budget_ms: float, samples: int = 5, threads: int = 1, min_rounds: int = 8) -> Dict:
+    measurements = []
+    chosen: Optional[int] = None
+    for rounds in range(max(BCRYPT_MIN_ROUNDS, min_rounds), BCRYPT_MAX_ROUNDS + 1):
+        verify_ms = time_verify(rounds, samples, threads) * 1000
+        measurements.append({"rounds": rounds, "verify_ms": round(verify_ms, 1)})
+        if verify_ms > budget_ms:
+            break
+        chosen = rounds
+    return {
+        "budget_ms": budget_ms,
+        "threads": threads,
+        "rounds": chosen,
+        "measurements": measurements,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, required=True, help="Target median time of one verify")
+    parser.add_argument("--samples", type=int, default=5, help="Verifies timed per cost and thread")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent verifies (e.g. PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--min-rounds", type=int, default=8, help="Lowest cost to try")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    result = calibrate(args.budget_ms, args.samples, max(1, args.threads), args.min_rounds)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for m in result["measurements"]:
+            marker = "  <-" if m["rounds"] == result["rounds"] else ""
+            print(f"rounds {m['rounds']:>2}: {m['verify_ms']:>9.1f} ms{marker}")
+    if result["rounds"] is None:
+        print(f"No cost from {args.min_rounds} fits {args.budget_ms} ms per verify", file=sys.stderr)
+        sys.exit(1)
+    if result["rounds"] < RECOMMENDED_MIN_ROUNDS:
+        print(f"Warning: {result['rounds']} rounds is below the recommended minimum of "
+              f"{RECOMMENDED_MIN_ROUNDS}", file=sys.stderr)
+    if not args.json:
+        print(f"PASSWORD_BCRYPT_ROUNDS={result['rounds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# backend/app/core/rate_limit.py
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from fastapi import Request
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.exceptions import TooManyRequestsException
+
+
+class RateLimitBackend(ABC):
+    """
+    Counts hits per key and decides whether another one fits in the window.
+    Implementations must be safe to call from the event loop without blocking on I/O
+    for long: /auth/login calls hit() before touching the database or bcrypt.
+    """
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window_seconds: float) -> Tuple[bool, float]:
+        """
+        Records one hit for key if it is allowed. Returns (allowed, retry_after_seconds);
+        rejected hits are not counted, so a key recovers as soon as its window slides on.
+        """
+
+    @abstractmethod
+    def check(self, key: str, limit: int, window_seconds: float) -> Tuple[bool, float]:
+        """Like hit(), but records nothing: for limits counted only on some outcomes."""
+
+    @abstractmethod
+    def record(self, key: str, window_seconds: float) -> None:
+        """Counts one hit for key unconditionally (the outcome check() was waiting for)."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class _Shard:
+    __slots__ = ("lock", "windows")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [window_start, count in current window, count in previous window]
+        self.windows: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+class InMemorySlidingWindowLimiter(RateLimitBackend):
+    """
+    Sliding-window counter (two fixed windows, the previous one weighted by how much
+    of it still overlaps the sliding window): O(1) time and three numbers per key.
+
+    Keys are spread over `shards` independently locked LRU dicts, each holding at most
+    max_keys / shards keys; the least recently hit key is evicted when a shard is full,
+    so memory stays bounded under a flood of distinct usernames or IPs.
+    """
+
+    def __init__(self, shards: int = 16, max_keys: int = 100_000):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self.max_keys_per_shard = max(1, max_keys // len(self._shards))
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def hit(self, key: str, limit: int, window_seconds: float) -> Tuple[bool, float]:
+        return self._hit(key, limit, window_seconds, count=True)
+
+    def check(self, key: str, limit: int, window_seconds: float) -> Tuple[bool, float]:
+        return self._hit(key, limit, window_seconds, count=False)
+
+    def record(self, key: str, window_seconds: float) -> None:
+        self._hit(key, math.inf, window_seconds, count=True)
+
+    def _hit(self, key: str, limit: float, window_seconds: float, count: bool) -> Tuple[bool, float]:
+        now = time.monotonic()
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            state = shard.windows.get(key)
+            if state is None:
+                if len(shard.windows) >= self.max_keys_per_shard:
+                    shard.windows.popitem(last=False)
+                    self.evictions += 1
+                state = shard.windows[key] = [now - now % window_seconds, 0, 0]
+            else:
+                shard.windows.move_to_end(key)
+
+            window_start = now - now % window_seconds
+            if window_start != state[0]:
+                # Roll forward; the old current window becomes "previous" only if adjacent.
+                adjacent = window_start - state[0] < window_seconds * 1.5
+                state[2] = state[1] if adjacent else 0
+                state[1] = 0
+                state[0] = window_start
+
+            elapsed = now - window_start
+            weight = 1.0 - elapsed / window_seconds
+            if state[2] * weight + state[1] >= limit:
+                self.rejected += 1
+                if state[1] >= limit:
+                    retry_after = window_seconds - elapsed
+                else:
+                    # Wait until enough of the previous window has slid out.
+                    retry_after = window_seconds * (1.0 - (limit - state[1]) / state[2]) - elapsed
+                return False, max(retry_after, 0.001)
+            if count:
+                state[1] += 1
+                self.allowed += 1
+            return True, 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": sum(len(shard.windows) for shard in self._shards),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+# Backends selectable with RATE_LIMIT_BACKEND; register a shared (e.g. Redis) backend here.
+RATE_LIMIT_BACKENDS = {
+    "memory": lambda: InMemorySlidingWindowLimiter(
+        shards=settings.RATE_LIMIT_SHARDS, max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    ),
+}
+
+
+def create_rate_limit_backend(name: str) -> RateLimitBackend:
+    try:
+        return RATE_LIMIT_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown rate limit backend {name!r}; expected one of {sorted(RATE_LIMIT_BACKENDS)}")
+
+
+rate_limiter = create_rate_limit_backend(settings.RATE_LIMIT_BACKEND)
+metrics.stats_collector(
+    "rate_limit", rate_limiter.stats, counters=("allowed", "rejected", "evictions"), gauges=("keys",),
+)
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # The rightmost entry is the one appended by our proxy; earlier ones are client-supplied.
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _username_key(username: str) -> str:
+    return "login:user:" + username[:256]
+
+
+def check_login_rate_limit(request: Request, username: str) -> None:
+    """
+    Raises TooManyRequestsException (429) when the client IP has used up its login
+    attempts, or the username its failed ones, for the sliding window. Costs a dict
+    lookup, not a bcrypt verify. Every attempt counts against the IP; only failures
+    (record_failed_login) count against the username, so logging in successfully
+    does not use up the account's budget.
+    """
+    window = settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+    checks = (
+        (rate_limiter.hit, "login:ip:" + client_ip(request), settings.LOGIN_RATE_LIMIT_PER_IP),
+        (rate_limiter.check, _username_key(username), settings.LOGIN_RATE_LIMIT_PER_USERNAME),
+    )
+    for limiter, key, limit in checks:
+        if limit <= 0:
+            continue
+        allowed, retry_after = limiter(key, limit, window)
+        if not allowed:
+            raise TooManyRequestsException(
+                detail="Too many login attempts, please retry later.",
+                retry_after=max(1, math.ceil(retry_after)),
+            )
+
+
+def record_failed_login(username: str) -> None:
+    # Verifies already in flight when the limit is reached may still add a few beyond it
+    if settings.LOGIN_RATE_LIMIT_PER_USERNAME > 0:
+        rate_limiter.record(_username_key(username), settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
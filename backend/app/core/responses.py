@@ -0,0 +1,99 @@
+# backend/app/core/responses.py
+"""
+Fast JSON responses for the /auth endpoints.
+
+When an endpoint returns a plain object, FastAPI validates it against the
+response_model (twice for a model instance: dump to a dict, validate it again),
+dumps the result to JSON-compatible Python, and then encodes that with json.dumps.
+json_response() does one step instead. pydantic-core's Rust serializer
+(TypeAdapter.dump_json, the same class of encoder as orjson) writes the body
+bytes directly. The adapter is built once per response model.
+
+Content is trusted, not validated: it comes from our own handlers and from
+database rows the schema already constrains. EmailStr re-validation on every
+/auth/me, for instance, is a large share of FastAPI's cost.
+
+- Model instances are serialized as they are.
+- Dicts (e.g. the token pair) are wrapped with model_construct.
+- ORM objects contribute only the schema's fields, read as attributes, so
+  columns such as hashed_password are never exposed.
+
+The response_model on the route still documents the schema in OpenAPI. With
+FAST_JSON_RESPONSES=False, json_response() hands the content back to FastAPI's
+default path (used by benchmarks/json_response_benchmark.py for comparison).
+
+etag_matches() / not_modified() serve conditional GETs: a request whose
+If-None-Match names the current ETag gets a bodiless 304, so nothing is serialized.
+"""
+import logging
+from functools import lru_cache
+from typing import Any, Mapping, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    from app.core.config import settings
+except ImportError as e:
+    logger.warning("Could not import actual settings in responses.py (%s). Using placeholders.", e)
+    class SettingsPlaceholder:
+        FAST_JSON_RESPONSES: bool = True
+    settings = SettingsPlaceholder()
+
+
+class FastJSONResponse(Response):
+    """A Response whose content is already-encoded JSON bytes."""
+
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def response_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def encode(model: Type[BaseModel], content: Any) -> bytes:
+    """JSON bytes of `content` as `model` (see the module docstring for accepted inputs)."""
+    if not isinstance(content, model):
+        if isinstance(content, Mapping):
+            content = model.model_construct(**content)
+        else:
+            content = model.model_construct(**{name: getattr(content, name) for name in model.model_fields})
+    return response_adapter(model).dump_json(content)
+
+
+def json_response(
+    model: Type[BaseModel],
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Any:
+    if not settings.FAST_JSON_RESPONSES:
+        return content # FastAPI validates and serializes it against the route's response_model
+    return FastJSONResponse(encode(model, content), status_code=status_code, headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match evaluation (RFC 9110 13.1.2): "*" or any listed tag equal to
+    `etag` under weak comparison, i.e. ignoring W/ prefixes.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    """304 with the validators and caching headers the 200 would have carried, and no body."""
+    return Response(status_code=304, headers=dict(headers))
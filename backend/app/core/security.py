@@ -1,61 +1,188 @@
+import hashlib
+import logging
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional
 
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
 
 # Attempt to import actual settings, fallback to placeholder
 settings_to_use = None
 try:
-    from backend.app.core.config import settings
+    from app.core.config import settings # Assuming 'app' is a package
     settings_to_use = settings
-    print("Successfully imported actual settings in security.py.")
 except ImportError as e:
-    print(f"Warning: Could not import actual settings in security.py ({e}). Using placeholders.")
+    logger.warning("Could not import actual settings in security.py (%s). Using placeholders.", e)
     class SettingsPlaceholder:
         JWT_SECRET_KEY: str = "fallback_secret_key_if_import_fails"
         JWT_ALGORITHM: str = "HS256"
         ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
         REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+        PASSWORD_HASH_EXECUTOR: str = "thread"
+        PASSWORD_HASH_WORKERS: int = 4
+        PASSWORD_HASH_MAX_QUEUE: int = 64
+        PASSWORD_HASH_MAX_WAIT_SECONDS: float = 2.0
+        PASSWORD_BCRYPT_ROUNDS: int = 12
+        TOKEN_CACHE_MAXSIZE: int = 50000
+        JWT_KEYS_DIR: str = ""
+        JWT_ACTIVE_KID: str = ""
+        JWT_KEYS_RELOAD_SECONDS: float = 60.0
     settings_to_use = SettingsPlaceholder()
 
+from app.core import metrics
+from app.core.cache import LRUTTLCache
+from app.core.hashing_pool import PasswordHashingPool
+from app.core.keys import KeyRing, is_asymmetric
+
 
 # Password Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Built on first use: passlib's import and bcrypt backend selection stay off the
+# startup path, and worker processes that never hash do not pay for them.
+# New hashes use PASSWORD_BCRYPT_ROUNDS (pick it with app/core/password_calibration.py).
+# Hashes with any other cost report needs_update, so logins upgrade (or downgrade) them.
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        rounds = settings_to_use.PASSWORD_BCRYPT_ROUNDS
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto",
+            bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds,
+        )
+    return _pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # Parses the hash's cost parameters only; no bcrypt work
+    return get_pwd_context().needs_update(hashed_password)
+
+# Async variants for request handlers: bcrypt runs on a bounded executor instead of
+# the event loop thread. Both raise PasswordHashingUnavailable (503) when load is shed.
+password_hashing_pool = PasswordHashingPool(
+    kind=settings_to_use.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings_to_use.PASSWORD_HASH_WORKERS,
+    max_queue=settings_to_use.PASSWORD_HASH_MAX_QUEUE,
+    max_wait_seconds=settings_to_use.PASSWORD_HASH_MAX_WAIT_SECONDS,
+)
+metrics.stats_collector(
+    "password_hash_pool", password_hashing_pool.stats,
+    counters=("completed", "rejected", "timed_out"), gauges=("queue_depth", "in_flight", "max_workers"),
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hashing_pool.run(get_password_hash, password)
 
 # Token Management
+# HS* algorithms sign with the shared JWT_SECRET_KEY. RS*/ES* sign with the active
+# key from JWT_KEYS_DIR, put its kid in the header, and verify by that kid, so other
+# services can check tokens against /.well-known/jwks.json without the secret.
+key_ring = KeyRing(
+    keys_dir=settings_to_use.JWT_KEYS_DIR,
+    algorithm=settings_to_use.JWT_ALGORITHM,
+    active_kid=settings_to_use.JWT_ACTIVE_KID,
+    reload_seconds=settings_to_use.JWT_KEYS_RELOAD_SECONDS,
+)
+
+def _encode_jwt(claims: Dict[str, Any]) -> str:
+    if is_asymmetric(settings_to_use.JWT_ALGORITHM):
+        key = key_ring.signing_key()
+        return jwt.encode(claims, key.private_pem, algorithm=key.algorithm, headers={"kid": key.kid})
+    return jwt.encode(claims, settings_to_use.JWT_SECRET_KEY, algorithm=settings_to_use.JWT_ALGORITHM)
+
+def _decode_jwt(token: str) -> Dict[str, Any]:
+    """Verifies signature and claims; raises JWTError if the token is not acceptable."""
+    if is_asymmetric(settings_to_use.JWT_ALGORITHM):
+        key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.public_pem, algorithms=[key.algorithm])
+    return jwt.decode(token, settings_to_use.JWT_SECRET_KEY, algorithms=[settings_to_use.JWT_ALGORITHM])
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+def _token_id_claims(now: datetime) -> Dict[str, Any]:
+    # jti: what /auth/logout and admin revoke deny; iat_us (iat in microseconds, as
+    # iat itself is whole seconds): compared with the user's
+    # tokens_valid_after (app/users/revocation.py)
+    iat = int(now.timestamp())
+    return {"jti": secrets.token_urlsafe(16), "iat": iat, "iat_us": iat * 1_000_000 + now.microsecond}
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings_to_use.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings_to_use.JWT_SECRET_KEY, algorithm=settings_to_use.JWT_ALGORITHM)
+        expire = now + timedelta(minutes=settings_to_use.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "type": ACCESS_TOKEN_TYPE, **_token_id_claims(now)})
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
 def create_refresh_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings_to_use.REFRESH_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=settings_to_use.REFRESH_TOKEN_EXPIRE_MINUTES)
     
-    # Add a specific claim for refresh tokens if desired, e.g. "type": "refresh"
-    # to_encode.update({"type": "refresh"}) 
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings_to_use.JWT_SECRET_KEY, algorithm=settings_to_use.JWT_ALGORITHM)
+    # The "type" claim keeps refresh tokens from being accepted as access tokens (and vice versa)
+    to_encode.update({"exp": expire, "type": REFRESH_TOKEN_TYPE, **_token_id_claims(now)})
+    encoded_jwt = _encode_jwt(to_encode)
     return encoded_jwt
 
+# Verified payloads keyed by a digest of the raw token. An entry lives until the
+# token's own exp, so a hit never outlives the signature check it stands in for.
+verified_token_cache = LRUTTLCache(
+    maxsize=settings_to_use.TOKEN_CACHE_MAXSIZE,
+    ttl_seconds=float("inf"),
+    name="verified_token",
+)
+metrics.stats_collector(
+    "cache", verified_token_cache.stats,
+    counters=("hits", "misses", "evictions", "expirations"), gauges=("size", "maxsize"),
+    labels={"cache": "verified_token"},
+)
+
+# result: "cached" (served from verified_token_cache), "verified" or "invalid"
+TOKEN_DECODES = metrics.counter("token_decodes", "Calls to decode_token by outcome", ("result",))
+_decodes_cached = TOKEN_DECODES.labels("cached")
+_decodes_verified = TOKEN_DECODES.labels("verified")
+_decodes_invalid = TOKEN_DECODES.labels("invalid")
+
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verifies the token signature and claims and returns its payload, or None if invalid.
+    This is the single decode path for all tokens; repeat calls with the same token
+    are served from verified_token_cache. The returned dict is a copy and safe to modify.
+    """
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = verified_token_cache.get(cache_key)
+    if payload is not None:
+        _decodes_cached.inc()
+        return dict(payload)
     try:
-        payload = jwt.decode(token, settings_to_use.JWT_SECRET_KEY, algorithms=[settings_to_use.JWT_ALGORITHM])
-        return payload
+        payload = _decode_jwt(token)
     except JWTError:
+        _decodes_invalid.inc()
         return None
+    _decodes_verified.inc()
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        # Translate the wall-clock exp into the cache's monotonic clock.
+        verified_token_cache.set(cache_key, payload, expires_at=time.monotonic() + (exp - time.time()))
+    return dict(payload)
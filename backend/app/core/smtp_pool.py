@@ -0,0 +1,197 @@
+# backend/app/core/smtp_pool.py
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a connection can no longer be trusted and is replaced.
+_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+class _PooledConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP sessions open and sends many messages over each,
+    so the TCP + (START)TLS + AUTH handshake is paid once per connection instead of once
+    per message.
+
+    - A connection idle for more than `max_idle_seconds` is health-checked with NOOP before reuse.
+    - A connection is recycled after `max_messages_per_connection` messages (0 = never).
+    - If a send fails because the connection broke, the message is retried once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        size: int = 4,
+        max_messages_per_connection: int = 100,
+        max_idle_seconds: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.size = max(1, size)
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        # Created lazily so the pool binds to the event loop that first uses it.
+        self._idle: Optional[asyncio.LifoQueue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.messages_sent = 0
+        self.send_failures = 0
+        self.reconnects = 0
+
+    def _ensure_primitives(self) -> None:
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _open(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            validate_certs=self.validate_certs,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password or "")
+        self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    async def _discard(self, conn: _PooledConnection, graceful: bool = True) -> None:
+        self.connections_closed += 1
+        try:
+            if graceful and conn.smtp.is_connected:
+                await conn.smtp.quit()
+            else:
+                conn.smtp.close()
+        except Exception:
+            conn.smtp.close()
+
+    async def _healthy(self, conn: _PooledConnection) -> bool:
+        if not conn.smtp.is_connected:
+            return False
+        if time.monotonic() - conn.last_used < self.max_idle_seconds:
+            return True
+        try:
+            await conn.smtp.noop()
+            return True
+        except _CONNECTION_ERRORS + (aiosmtplib.SMTPResponseException,):
+            return False
+
+    async def _checkout(self) -> _PooledConnection:
+        # Caller holds a slot. Reuse the most recently used idle connection if it is healthy.
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            if await self._healthy(conn):
+                return conn
+            self.reconnects += 1
+            await self._discard(conn, graceful=False)
+        return await self._open()
+
+    def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        self._idle.put_nowait(conn)
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Sends one message over a pooled connection. SMTP-level rejections
+        (e.g. refused recipients) are raised; the connection stays in the pool.
+        """
+        self._ensure_primitives()
+        async with self._slots:
+            conn = await self._checkout()
+            for attempt in (1, 2):
+                try:
+                    await conn.smtp.send_message(message)
+                except _CONNECTION_ERRORS:
+                    await self._discard(conn, graceful=False)
+                    if attempt == 2:
+                        self.send_failures += 1
+                        raise
+                    self.reconnects += 1
+                    try:
+                        conn = await self._open()
+                    except Exception: # The message is lost with the reconnect
+                        self.send_failures += 1
+                        raise
+                    continue
+                except Exception:
+                    self.send_failures += 1
+                    # Reset the transaction so the session is reusable for the next message.
+                    try:
+                        await conn.smtp.rset()
+                        self._checkin(conn)
+                    except Exception:
+                        await self._discard(conn, graceful=False)
+                    raise
+                break
+
+            self.messages_sent += 1
+            conn.messages_sent += 1
+            if self.max_messages_per_connection and conn.messages_sent >= self.max_messages_per_connection:
+                await self._discard(conn)
+            else:
+                self._checkin(conn)
+
+    async def send_many(self, messages: Iterable[EmailMessage]) -> List[Optional[BaseException]]:
+        """
+        Sends messages concurrently across the pool's connections (each connection
+        sends its share back to back). Returns one entry per message: None on
+        success, or the exception raised for it.
+        """
+        results = await asyncio.gather(*(self.send(m) for m in messages), return_exceptions=True)
+        return [r if isinstance(r, BaseException) else None for r in results]
+
+    async def close(self) -> None:
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            await self._discard(self._idle.get_nowait())
+        self._idle = None
+        self._slots = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "connections_opened": self.connections_opened,
+            "connections_closed": self.connections_closed,
+            "messages_sent": self.messages_sent,
+            "send_failures": self.send_failures,
+            "reconnects": self.reconnects,
+        }
@@ -1,3 +1,5 @@
+import logging
+
 from sqlalchemy import Column, Integer, DateTime
 from sqlalchemy.sql import func
 # Import Base from the existing database.py
@@ -10,9 +12,8 @@ from sqlalchemy.sql import func
 # Attempt to import Base
 try:
     from app.db.database import Base # Assuming 'app' is a package
-    print("Successfully imported Base from app.db.database in base_model.py.")
 except ImportError:
-    print("Critical Warning: Could not import Base from app.db.database in base_model.py. This will likely cause issues.")
+    logging.getLogger(__name__).error("Could not import Base from app.db.database in base_model.py. This will likely cause issues.")
     # Fallback Base if absolutely necessary for subtask to run, though this indicates a problem
     from sqlalchemy.ext.declarative import declarative_base
     Base = declarative_base()
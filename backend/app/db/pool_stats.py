@@ -0,0 +1,133 @@
+# backend/app/db/pool_stats.py
+import bisect
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets; the last bucket is +Inf.
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolStats:
+    """
+    Counters and a checkout wait-time histogram for one connection pool.
+    Fed by SQLAlchemy pool events and by the instrumented pool classes below.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None # Current pool; replaced when the engine is disposed and recreates it
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_bucket_counts: List[int] = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.wait_bucket_counts[bisect.bisect_left(WAIT_TIME_BUCKETS, seconds)] += 1
+        self.wait_sum += seconds
+        self.wait_count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.pool
+        live: Dict[str, Any] = {}
+        if isinstance(pool, QueuePool):
+            live = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            }
+        cumulative, running = [], 0
+        for count in self.wait_bucket_counts:
+            running += count
+            cumulative.append(running)
+        return {
+            "name": self.name,
+            **live,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_time": {
+                "buckets": list(WAIT_TIME_BUCKETS) + [float("inf")],
+                "cumulative_counts": cumulative,
+                "sum": self.wait_sum,
+                "count": self.wait_count,
+            },
+        }
+
+
+# Keyed by the pool's logging name, which survives engine.dispose()/pool.recreate().
+_registry: Dict[str, PoolStats] = {}
+
+
+def _stats_for(pool) -> PoolStats:
+    name = pool._orig_logging_name or "default"
+    stats = _registry.get(name)
+    if stats is None:
+        stats = _registry[name] = PoolStats(name)
+    stats.pool = pool
+    return stats
+
+
+class _TimedCheckoutMixin:
+    # _do_get is where QueuePool blocks for a free connection (up to pool_timeout).
+    def _do_get(self):
+        stats = _stats_for(self)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.observe_wait(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(sync_engine) -> PoolStats:
+    """
+    Registers pool event listeners on a (sync) Engine and returns its PoolStats.
+    For an AsyncEngine pass `async_engine.sync_engine`.
+    """
+    stats = _stats_for(sync_engine.pool)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    return stats
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Live statistics of every instrumented pool, keyed by pool name.
+    """
+    return {name: stats.snapshot() for name, stats in _registry.items()}
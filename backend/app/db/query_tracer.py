@@ -0,0 +1,148 @@
+# backend/app/db/query_tracer.py
+"""
+Per-request SQL tracing hooked into the engines in app/db/database.py.
+
+- Every statement gets a trailing comment naming the route that issued it
+  (/* route='GET /api/v1/auth/me' */), so it can be attributed in pg_stat_statements
+  and the server's slow log. Only route templates are used, never raw paths.
+- Statements slower than SQL_SLOW_QUERY_MS are logged with the *shape* of their
+  bound parameters (names and types, never values), so the log is safe to keep on.
+- Identical SELECTs executed SQL_REPEATED_QUERY_THRESHOLD or more times in one
+  request (the N+1 pattern) are logged once when the request ends. Writes are not
+  counted: batched INSERTs (bulk import) repeat by design.
+- QueryTracerMiddleware adds X-DB-Queries and X-DB-Time (milliseconds) response
+  headers. They count statements issued before the response started; work done
+  while streaming a body, or in background tasks, is not included.
+
+Enabled with SQL_TRACE_ENABLED (app/main.py and app/db/database.py wire it up);
+the slow-query log alone works without it.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTrace:
+    __slots__ = ("scope", "queries", "seconds", "statements")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {} # SELECT text -> executions
+
+    def route(self) -> str:
+        # Resolved lazily: the router fills in scope["endpoint"] after the middleware starts
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+
+# The trace of the request being served; None outside requests (CLI, outbox worker).
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_sql_trace", default=None)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Describes bound parameters without their values: {'username': str, 'id_1': int},
+    or for executemany the row count and the shape of the first row.
+    """
+    if executemany and isinstance(parameters, (list, tuple)):
+        if not parameters:
+            return "[]"
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key!r}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _route_comment(route: str) -> str:
+    # Route templates come from our own routing table; strip anything that could end the comment.
+    return " /* route='" + route.replace("*/", "").replace("'", "") + "' */"
+
+
+def instrument_engine_tracing(sync_engine, slow_query_ms: float, route_comments: bool) -> None:
+    """
+    Registers the tracer on an Engine (for an AsyncEngine pass `async_engine.sync_engine`).
+    Like app.core.metrics, it relies on SQLAlchemy running async engine events in a
+    greenlet that shares the request's context. slow_query_ms <= 0 disables the slow log.
+    """
+    slow_seconds = slow_query_ms / 1000.0
+
+    @event.listens_for(sync_engine, "before_cursor_execute", retval=True)
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        conn.info["tracer_query_started"] = time.perf_counter()
+        if trace is not None:
+            if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+                trace.statements[statement] = trace.statements.get(statement, 0) + 1
+            if route_comments:
+                statement += _route_comment(trace.route())
+        return statement, parameters
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("tracer_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.queries += 1
+            trace.seconds += elapsed
+        if slow_seconds > 0 and elapsed >= slow_seconds:
+            logger.warning(
+                "Slow SQL (%.1f ms): %s params=%s",
+                elapsed * 1000, " ".join(statement.split()), parameter_shape(parameters, executemany),
+            )
+
+
+def _report_repeats(trace: RequestTrace, threshold: int) -> None:
+    for statement, count in trace.statements.items():
+        if count >= threshold:
+            logger.warning(
+                "Repeated SQL: %d identical statements in %s: %s",
+                count, trace.route(), " ".join(statement.split()),
+            )
+
+
+class QueryTracerMiddleware:
+    """
+    Pure ASGI middleware that opens a RequestTrace per HTTP request, adds the
+    X-DB-Queries / X-DB-Time headers and reports repeated statements at the end
+    (repeated_query_threshold <= 1 disables that report).
+    """
+
+    def __init__(self, app, repeated_query_threshold: int = 3):
+        self.app = app
+        self.repeated_query_threshold = repeated_query_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(trace.queries).encode("latin-1")))
+                headers.append((b"x-db-time", f"{trace.seconds * 1000:.2f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            if self.repeated_query_threshold > 1:
+                _report_repeats(trace, self.repeated_query_threshold)
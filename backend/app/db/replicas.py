@@ -0,0 +1,215 @@
+# backend/app/db/replicas.py
+"""
+Read-replica routing for the async session (DATABASE_REPLICA_URLS).
+
+Only statements executed with bind_arguments={"replica": True} can go to a replica:
+crud's user lookups (get_user, get_user_by_username, get_user_by_email) do this
+through replica_execute(). Among them are the login credential check and the
+principal lookup behind every authenticated request; a caller whose result
+becomes token state passes replica=False instead. Everything else, including every
+write, token lookup and SELECT ... FOR UPDATE, uses the primary. A session that
+has written in its current transaction reads from the primary as well, so it
+sees its own changes.
+
+- Replicas are picked round-robin. A replica whose connection fails is ejected
+  for DB_REPLICA_EJECT_SECONDS. The failed lookup is retried on the primary, and
+  once every replica is ejected reads simply go to the primary.
+- Read-your-writes: crud notes each user row it changes. For
+  DB_READ_YOUR_WRITES_SECONDS afterwards, lookups of that user (by id, username
+  or email) skip the replicas, so a user does not see their own change
+  disappear while the replicas catch up. The window is per process; set it
+  above the replicas' usual lag. Password resets and revoke-all made by other
+  workers reach this one through run_revocation_sync (app/users/revocation.py),
+  which notes the user the same way, so a lagging replica cannot hand back the
+  old password hash or tokens_valid_after.
+
+To try it locally with SQLite, create the schema in one file, copy it, and point the
+replica at the copy (it is never written, so divergence shows which side served a read):
+
+    DATABASE_URL=sqlite:////tmp/primary.db DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db
+
+or run two Postgres instances with streaming replication and list the standby.
+"""
+import itertools
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    __slots__ = ("name", "engine", "ejected_until", "reads", "ejections")
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.ejections = 0
+
+
+class ReplicaSet:
+    """Round-robin choice among healthy replicas, with time-based ejection."""
+
+    def __init__(self, engines: Dict[str, AsyncEngine], eject_seconds: float = 30.0):
+        self.replicas = [_Replica(name, engine) for name, engine in engines.items()]
+        self.eject_seconds = eject_seconds
+        self._next = itertools.count()
+        self._by_sync_engine = {replica.engine.sync_engine: replica for replica in self.replicas}
+        for replica in self.replicas:
+            self._watch(replica)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _watch(self, replica: _Replica) -> None:
+        @event.listens_for(replica.engine.sync_engine, "handle_error")
+        def _on_error(context):
+            # Connection-level failures only; a bad query is not the replica's fault.
+            if context.is_disconnect or context.connection is None:
+                self.eject(replica, context.original_exception)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if replica.ejected_until <= now:
+                replica.reads += 1
+                return replica.engine
+        return None
+
+    def eject(self, replica: _Replica, reason: Any = None) -> None:
+        if replica.ejected_until > time.monotonic():
+            return
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        replica.ejections += 1
+        logger.warning("Ejecting read replica %s for %.0fs: %s", replica.name, self.eject_seconds, reason)
+
+    def eject_engine(self, sync_engine, reason: Any = None) -> None:
+        replica = self._by_sync_engine.get(sync_engine)
+        if replica is not None:
+            self.eject(replica, reason)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.ejected_until <= now,
+                "reads": replica.reads,
+                "ejections": replica.ejections,
+            }
+            for replica in self.replicas
+        ]
+
+
+class ReadYourWrites:
+    """Keys (e.g. "u:alice") of rows written in the last window_seconds by this process."""
+
+    def __init__(self, window_seconds: float, maxsize: int = 100_000):
+        self._recent = LRUTTLCache(maxsize=maxsize if window_seconds > 0 else 0, ttl_seconds=window_seconds,
+                                   name="read_your_writes")
+
+    def note(self, *keys: str) -> None:
+        for key in keys:
+            self._recent.set(key, True)
+
+    def is_recent(self, *keys: str) -> bool:
+        return any(self._recent.get(key) is not None for key in keys)
+
+
+class RoutingSession(Session):
+    """
+    Session whose get_bind sends replica-eligible reads to `replicas` and everything
+    else to the primary. Both class attributes are set on the subclass built by
+    routing_session_class.
+    """
+
+    replicas: Optional[ReplicaSet] = None
+    recent_writes: Optional[ReadYourWrites] = None
+
+    def get_bind(self, mapper=None, *, clause=None, bind=None, replica: bool = False, **kw):
+        if replica and self.replicas and not self._flushing and not self.info.get("wrote"):
+            engine = self.replicas.choose()
+            if engine is not None:
+                self.info["replica_bind"] = engine.sync_engine
+                return engine.sync_engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kw)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute", propagate=True)
+def _note_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush", propagate=True)
+def _note_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit", propagate=True)
+@event.listens_for(RoutingSession, "after_rollback", propagate=True)
+def _end_transaction(session):
+    session.info.pop("wrote", None)
+
+
+def routing_session_class(replicas: ReplicaSet, recent_writes: ReadYourWrites) -> type:
+    """A RoutingSession subclass bound to `replicas`, for async_sessionmaker(sync_session_class=...)."""
+    return type("RoutingSession", (RoutingSession,), {"replicas": replicas, "recent_writes": recent_writes})
+
+
+async def replica_execute(db: AsyncSession, statement, sticky_keys: Iterable[str] = (), replica: bool = True):
+    """
+    Executes a read-only statement on a replica when `replica` is set, replicas are
+    configured and none of `sticky_keys` was written recently; otherwise on the primary.
+
+    If the replica fails, it is ejected and the read is retried on the primary.
+    A session that already holds loaded objects re-raises instead, because the
+    retry needs a rollback and that would expire those objects.
+    """
+    session = db.sync_session
+    if not replica or not getattr(session, "replicas", None) or session.recent_writes.is_recent(*sticky_keys):
+        return await db.execute(statement)
+    try:
+        return await db.execute(statement, bind_arguments={"replica": True})
+    except DBAPIError as e:
+        failed = session.info.get("replica_bind")
+        if failed is None: # Routed to the primary after all
+            raise
+        session.replicas.eject_engine(failed, e.orig)
+        if len(session.identity_map):
+            raise
+        await db.rollback()
+        return await db.execute(statement)
+    finally:
+        session.info.pop("replica_bind", None)
+
+
+def register_replica_metrics(replicas: ReplicaSet) -> None:
+    def collect():
+        stats = replicas.stats()
+        return [
+            metrics.Family("db_replica_healthy", "gauge", "1 while the replica receives reads, 0 while ejected",
+                           [("", (("replica", s["name"]),), int(s["healthy"])) for s in stats]),
+            metrics.Family("db_replica_reads_total", "counter", "Reads routed to the replica",
+                           [("", (("replica", s["name"]),), s["reads"]) for s in stats]),
+            metrics.Family("db_replica_ejections_total", "counter", "Times the replica was ejected",
+                           [("", (("replica", s["name"]),), s["ejections"]) for s in stats]),
+        ]
+
+    if replicas:
+        metrics.registry.add_collector(collect)
@@ -0,0 +1,81 @@
+# backend/app/db/schema_check.py
+"""
+Startup check that the database is at the Alembic head revision (DB_SCHEMA_STARTUP=check).
+
+Costs one `SELECT version_num FROM alembic_version` instead of reflecting or creating
+tables. The head revision(s) are read from the migration files' `revision` /
+`down_revision` assignments with ast, so the API does not import Alembic (~0.1s) at
+startup. Migrations themselves are still applied with `alembic upgrade head`.
+"""
+import ast
+import os
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+VERSIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "alembic", "versions"))
+
+
+class SchemaRevisionMismatch(RuntimeError):
+    pass
+
+
+def _revision_identifiers(path: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    values: Dict[str, object] = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target, value = node.targets[0], node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target, value = node.target, node.value
+        else:
+            continue
+        if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+            values[target.id] = ast.literal_eval(value)
+    revision = values.get("revision")
+    if not isinstance(revision, str):
+        return None
+    down = values.get("down_revision")
+    if down is None:
+        parents: Tuple[str, ...] = ()
+    elif isinstance(down, str):
+        parents = (down,)
+    else:
+        parents = tuple(down) # Merge revision
+    return revision, parents
+
+
+def head_revisions(versions_dir: str = VERSIONS_DIR) -> Set[str]:
+    """Revisions no other migration revises, i.e. what `alembic heads` prints."""
+    revisions, revised = set(), set()
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py") or name.startswith("__"):
+            continue
+        identifiers = _revision_identifiers(os.path.join(versions_dir, name))
+        if identifiers is None:
+            continue
+        revisions.add(identifiers[0])
+        revised.update(identifiers[1])
+    return revisions - revised
+
+
+async def verify_schema_revision(async_engine) -> None:
+    """
+    Raises SchemaRevisionMismatch unless the database's alembic_version rows equal the
+    migration heads on disk, so a pod never serves against an un-migrated schema.
+    """
+    expected = head_revisions()
+    try:
+        async with async_engine.connect() as conn:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+    except DBAPIError as e:
+        raise SchemaRevisionMismatch(
+            f"Could not read alembic_version ({e.__class__.__name__}); run `alembic upgrade head`."
+        ) from e
+    if current != expected:
+        raise SchemaRevisionMismatch(
+            f"Database schema is at {sorted(current) or 'no revision'}, code expects {sorted(expected)}; "
+            "run `alembic upgrade head` before starting the API."
+        )
@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter() # For the startup timing log below
+
+import asyncio
+import hmac
+import logging
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = logging.getLogger(__name__)
+
 # Attempt to import local modules. Critical for functionality.
 # Fallbacks are for ensuring subtask can run if environment is broken.
 users_router_imported = False # Initialize flags
 db_utils_imported = False
+password_hashing_pool = None # Set by the imports below; shut down on application exit
+key_ring = None # JWT signing keys; serves /.well-known/jwks.json
 
 # Import Starlette's HTTPException for broader handler registration
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -19,22 +30,29 @@ from app.core.error_handlers import (
 )
 
 try:
-    from app.users import router as auth_router # Corrected import
+    from app.users.router import router as auth_router # The APIRouter instance, not the module
+    from app.users.admin_router import router as admin_router
+    from app.users.bulk_import import shutdown_hash_executor
     users_router_imported = True
-    from app.db.database import create_db_and_tables # Corrected import
+    from app.db.database import async_engine, create_db_and_tables, dispose_engines # Corrected import
+    from app.db.schema_check import SchemaRevisionMismatch, verify_schema_revision
     db_utils_imported = True
-    # Optional: from app.core.config import settings (if needed directly in main)
-    print("Successfully imported auth_router and create_db_and_tables in main.py.")
+    from app.core.security import password_hashing_pool, key_ring
+    from app.core.config import settings
+    from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+    from app.db.query_tracer import QueryTracerMiddleware
 except ImportError as e:
-    print(f"Critical Error during import in main.py: {e}. API will be non-functional or limited.")
+    logger.critical("Error during import in main.py: %s. API will be non-functional or limited.", e)
     # Define placeholders if absolutely necessary for the subtask to run
     from fastapi import APIRouter
     if not users_router_imported: # Check if this specific import failed
         auth_router = APIRouter() # Empty router
-        print("Warning: Using placeholder auth_router in main.py.")
+        logger.warning("Using placeholder auth_router in main.py.")
     if not db_utils_imported: # Check if this specific import failed
         def create_db_and_tables():
-            print("Warning: Using placeholder create_db_and_tables in main.py. Database not initialized.")
+            logger.warning("Using placeholder create_db_and_tables in main.py. Database not initialized.")
+        async def dispose_engines():
+            pass
     # Ensure flags reflect the actual success/failure of each import
     # (already handled by initializing to False and setting to True in try)
 
@@ -74,27 +92,126 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request SQL counts in X-DB-Queries / X-DB-Time and repeated-query warnings
+if users_router_imported and settings.SQL_TRACE_ENABLED:
+    app.add_middleware(QueryTracerMiddleware, repeated_query_threshold=settings.SQL_REPEATED_QUERY_THRESHOLD)
+
+# Added last so it is the outermost middleware and times the whole request
+if users_router_imported and settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include Routers
 if users_router_imported:
     app.include_router(auth_router, prefix="/api/v1") # Adding a common API prefix
+    app.include_router(admin_router, prefix="/api/v1")
 else:
-    print("Warning: Auth router not included in main.py due to import failure.")
+    logger.warning("Auth router not included in main.py due to import failure.")
+
+_import_finished = time.perf_counter()
+
+# Background build/refresh of the username/email availability filter
+availability_stop_event = None
+availability_task = None
+
+# Mirrors token revocations made by other workers (app/users/revocation.py)
+revocation_stop_event = None
+revocation_task = None
+
+# Optional in-process outbox drain (EMAIL_OUTBOX_IN_PROCESS_WORKER); production runs
+# `python -m app.core.outbox_worker` as a separate process instead.
+outbox_stop_event = None
+outbox_task = None
 
 # Startup Event for Database Initialization
 @app.on_event("startup")
 async def on_startup():
-    if db_utils_imported:
-        print("Application startup: Initializing database...")
+    global outbox_stop_event, outbox_task, availability_stop_event, availability_task
+    global revocation_stop_event, revocation_task
+    startup_started = time.perf_counter()
+    if not db_utils_imported:
+        logger.warning("Database initialization skipped in main.py due to import failure of create_db_and_tables.")
+    elif settings.DB_SCHEMA_STARTUP == "check":
+        # Production: one SELECT against alembic_version; refuses to start on a stale schema
+        try:
+            await verify_schema_revision(async_engine)
+        except SchemaRevisionMismatch:
+            await dispose_engines() # Shutdown hooks do not run when startup fails
+            raise
+    elif settings.DB_SCHEMA_STARTUP == "create_all":
         create_db_and_tables()
-        print("Database tables created/verified.")
-    else:
-        print("Warning: Database initialization skipped in main.py due to import failure of create_db_and_tables.")
+    elif settings.DB_SCHEMA_STARTUP != "skip":
+        raise ValueError(f"Unknown DB_SCHEMA_STARTUP {settings.DB_SCHEMA_STARTUP!r}; expected check, create_all or skip")
+    if users_router_imported and settings.EMAIL_OUTBOX_IN_PROCESS_WORKER:
+        from app.core.outbox_worker import run_worker
+        outbox_stop_event = asyncio.Event()
+        outbox_task = asyncio.create_task(run_worker(stop_event=outbox_stop_event))
+    elif users_router_imported:
+        logger.warning(
+            "EMAIL_OUTBOX_IN_PROCESS_WORKER is off: verification and password reset emails stay "
+            "queued in email_outbox until `python -m app.core.outbox_worker` runs against this database."
+        )
+    if users_router_imported and settings.AVAILABILITY_FILTER_ENABLED:
+        from app.db.database import AsyncSessionLocal
+        from app.users.availability import run_refresher
+        availability_stop_event = asyncio.Event()
+        availability_task = asyncio.create_task(run_refresher(AsyncSessionLocal, availability_stop_event))
+    if users_router_imported and db_utils_imported:
+        from app.db.database import AsyncSessionLocal
+        from app.users.revocation import run_revocation_sync
+        revocation_stop_event = asyncio.Event()
+        revocation_task = asyncio.create_task(run_revocation_sync(AsyncSessionLocal, revocation_stop_event))
+    now = time.perf_counter()
+    logger.info(
+        "Startup finished in %.0f ms (app.main import %.0f ms, startup hooks %.0f ms; schema mode %s)",
+        (now - _import_started) * 1000, (_import_finished - _import_started) * 1000,
+        (now - startup_started) * 1000, settings.DB_SCHEMA_STARTUP if db_utils_imported else "unavailable",
+    )
+
+# Shutdown Event: release pooled async DB connections and the password hashing executors
+@app.on_event("shutdown")
+async def on_shutdown():
+    if availability_task is not None:
+        availability_stop_event.set()
+        availability_task.cancel() # A build in progress is abandoned
+        await asyncio.gather(availability_task, return_exceptions=True)
+    if revocation_task is not None:
+        revocation_stop_event.set()
+        await asyncio.gather(revocation_task, return_exceptions=True)
+    if outbox_task is not None:
+        outbox_stop_event.set()
+        await outbox_task
+        from app.core.email_service import close_smtp_pool
+        await close_smtp_pool()
+    await dispose_engines()
+    if password_hashing_pool is not None:
+        password_hashing_pool.shutdown()
+    if users_router_imported:
+        shutdown_hash_executor()
 
 # Root Endpoint for Testing
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Recovered API. Navigate to /docs for API documentation."}
 
+# Public verification keys for services that validate our tokens locally.
+# Empty when tokens are signed with the shared HS256 secret.
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks(response: Response):
+    if key_ring is None:
+        return {"keys": []}
+    response.headers["Cache-Control"] = f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"
+    return key_ring.jwks()
+
+# Prometheus scrape target; per worker process (see app/core/metrics.py)
+if users_router_imported and settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        if settings.METRICS_AUTH_TOKEN:
+            expected = f"Bearer {settings.METRICS_AUTH_TOKEN}"
+            if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+                raise HTTPException(status_code=401, detail="Invalid metrics token")
+        return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Optional: Add uvicorn run command example in comments for convenience
 # if __name__ == "__main__":
 #     import uvicorn
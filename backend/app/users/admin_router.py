@@ -0,0 +1,124 @@
+# backend/app/users/admin_router.py
+import json
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.dependencies import get_db, get_current_superuser
+from app.core.exceptions import UserNotFoundException
+from app.core.security import decode_token
+from app.db.database import AsyncSessionLocal
+from app.users import crud, schemas
+from app.users.bulk_import import IMPORT_FORMATS, import_users, iter_lines
+
+
+router = APIRouter(
+    prefix="/admin/users",
+    tags=["Admin"],
+    dependencies=[Depends(get_current_superuser)],
+)
+
+_CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+@router.post("/import", response_model=schemas.BulkImportReport)
+async def bulk_import_users(
+    request: Request,
+    format: str | None = Query(None, description="csv or ndjson; defaults from the Content-Type"),
+    batch_size: int | None = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Streams a CSV (with header row) or NDJSON body of users into the database.
+    Columns/keys: username, email, password or hashed_password (bcrypt),
+    and optionally is_active, is_verified_email, is_superuser.
+    Rows that conflict with existing users or fail validation are reported, not fatal.
+    """
+    fmt = format or _CONTENT_TYPE_FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson",
+        )
+    return await import_users(db, iter_lines(request.stream()), fmt, batch_size=batch_size)
+
+
+@router.post("/revoke-token", response_model=schemas.MessageSchema)
+async def revoke_token(request_data: schemas.TokenRevokeRequest, db: AsyncSession = Depends(get_db)):
+    """Denies one access or refresh token until its expiry (it must still be valid)."""
+    payload = decode_token(request_data.token)
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token is invalid or already expired.")
+    if not await crud.revoke_token(db, payload):
+        return {"message": "Token was already revoked or cannot be revoked individually."}
+    return {"message": "Token revoked."}
+
+
+@router.post("/{user_id}/revoke-tokens", response_model=schemas.MessageSchema)
+async def revoke_user_tokens(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Invalidates every token issued to the user so far and ends their refresh sessions."""
+    user = await crud.get_user(db, user_id)
+    if user is None:
+        raise UserNotFoundException()
+    await crud.revoke_user_tokens(db, user)
+    return {"message": f"All tokens of {user.username} revoked."}
+
+
+@router.get("", response_model=schemas.UserPage)
+async def list_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    sort: Literal["id", "created_at"] = "id",
+    is_active: bool | None = None,
+    is_verified_email: bool | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Keyset-paginated user listing: follow next_cursor until it is null.
+    Each page is an index range scan after the previous page's last row, never an OFFSET.
+    """
+    users, next_cursor = await crud.list_users_page(
+        db, limit=limit, sort=sort, cursor=cursor, is_active=is_active, is_verified_email=is_verified_email,
+    )
+    return schemas.UserPage(items=users, next_cursor=next_cursor)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+@router.get("/export")
+async def export_users(
+    sort: Literal["id", "created_at"] = "id",
+    is_active: bool | None = None,
+    is_verified_email: bool | None = None,
+):
+    """
+    Streams every matching user as NDJSON (one UserAdminRead object per line)
+    from a server-side cursor, in constant memory.
+    """
+    async def ndjson_lines():
+        # Own session: the request's get_db session is closed before the body streams.
+        async with AsyncSessionLocal() as db:
+            async for rows in crud.stream_users(
+                db, sort=sort, is_active=is_active, is_verified_email=is_verified_email,
+                batch_size=settings.ADMIN_EXPORT_BATCH_SIZE,
+            ):
+                yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'},
+    )
@@ -0,0 +1,230 @@
+# backend/app/users/availability.py
+"""
+In-memory Bloom filter over registered usernames and emails, for live
+"is this name taken?" checks on the signup form.
+
+A negative answer from the filter is definitive, so most keystrokes never reach
+the database; a positive answer may be a false positive and is confirmed with
+one indexed lookup. Every worker keeps its own filter:
+
+- it is built in the background at startup from a streamed scan of the users
+  table (rows are hashed into the filter on a worker thread), and rebuilt every
+  AVAILABILITY_FILTER_REFRESH_SECONDS so deleted users stop costing lookups;
+- registrations and bulk imports in this process are added at once;
+- rows written by other workers are picked up every AVAILABILITY_FILTER_SYNC_SECONDS
+  by polling for ids above the last one seen, the way run_revocation_sync tails
+  its feed. Until the next poll a name just taken through another worker can
+  still be reported free.
+
+Keys are normalized the way /register stores them (EmailStr lowercases the
+email's domain). Availability is advisory: /register still relies on the
+unique constraints.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import validate_email
+from pydantic_core import PydanticCustomError
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import metrics
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.users import models
+
+logger = logging.getLogger(__name__)
+
+# Out-of-order commits are waited for this long (see run_revocation_sync)
+GAP_TIMEOUT_SECONDS = 60.0
+MAX_TRACKED_GAPS = 1000
+
+# Usernames and emails share one filter; the prefix keeps "bob" the username
+# apart from a (hypothetical) email "bob".
+_USERNAME_PREFIX = "u:"
+_EMAIL_PREFIX = "e:"
+
+
+def normalize_email(email: str) -> str:
+    """The form schemas.UserCreate's EmailStr stores; input it rejects is returned unchanged."""
+    try:
+        return validate_email(email)[1]
+    except PydanticCustomError:
+        return email
+
+
+def _add_rows(bloom: BloomFilter, rows) -> None:
+    for _, username, email in rows:
+        bloom.add(_USERNAME_PREFIX + username)
+        bloom.add(_EMAIL_PREFIX + email)
+
+
+class AvailabilityIndex:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None # None until the first build completes
+        self._pending: Optional[List[Tuple[int, str, str]]] = None # Adds made while a rebuild runs
+        # Highest user id seen, and ids below it not seen yet: a transaction that took an
+        # id earlier may commit after a later one was read (id -> give-up monotonic time)
+        self.cursor = 0
+        self.gaps: Dict[int, float] = {}
+        self.built_at: Optional[float] = None
+        self.build_seconds = 0.0
+        self.filter_negatives = 0 # Answered from memory
+        self.db_checks = 0 # Positive (or not-built) answers confirmed in the DB
+        self.false_positives = 0
+        self.synced_rows = 0 # Added by the poll, i.e. mostly written by other workers
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def add(self, username: str, email: str) -> None:
+        if self._pending is not None:
+            self._pending.append((0, username, email))
+        if self._filter is not None:
+            self._filter.add(_USERNAME_PREFIX + username)
+            self._filter.add(_EMAIL_PREFIX + email)
+
+    def might_contain_username(self, username: str) -> bool:
+        return self._filter is None or (_USERNAME_PREFIX + username) in self._filter
+
+    def might_contain_email(self, email: str) -> bool:
+        return self._filter is None or (_EMAIL_PREFIX + email) in self._filter
+
+    async def rebuild(self, db: AsyncSession, batch_size: int = 10000) -> None:
+        """Builds a fresh filter from a streamed scan and swaps it in."""
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            total = (await db.execute(select(func.count()).select_from(models.User))).scalar_one()
+            # Two entries per user, with headroom so growth until the next rebuild
+            # does not push the false-positive rate past its target.
+            bloom = BloomFilter(max(self.capacity, int(total * 2 * 1.25)), self.error_rate)
+            result = await db.stream(
+                select(models.User.id, models.User.username, models.User.email)
+                .execution_options(yield_per=batch_size)
+            )
+            cursor = 0
+            async for partition in result.partitions():
+                # Hashing 10M entries takes a while; keep it off the event loop
+                await asyncio.to_thread(_add_rows, bloom, partition)
+                cursor = max(cursor, max(row[0] for row in partition))
+            # Only the newest ids can still be in flight; look for holes among them
+            recent = await db.execute(select(models.User.id).where(models.User.id > cursor - MAX_TRACKED_GAPS))
+            seen = set(recent.scalars())
+            _add_rows(bloom, self._pending) # Registrations made meanwhile, on the loop thread
+            self._filter = bloom
+        finally:
+            self._pending = None
+        give_up_at = time.monotonic() + GAP_TIMEOUT_SECONDS
+        self.gaps = {
+            missing: give_up_at for missing in range(max(1, cursor - MAX_TRACKED_GAPS + 1), cursor)
+            if missing not in seen
+        }
+        self.cursor = cursor
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+        logger.info("Availability filter built: %s in %.1fs", bloom.stats(), self.build_seconds)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Adds users with an id above the cursor (or in a tracked gap). Returns how many."""
+        newer = models.User.id > self.cursor
+        result = await db.execute(
+            select(models.User.id, models.User.username, models.User.email)
+            .where(or_(newer, models.User.id.in_(list(self.gaps))) if self.gaps else newer)
+            .order_by(models.User.id)
+        )
+        rows = result.all()
+        previous_cursor = self.cursor
+        seen = set()
+        for user_id, username, email in rows:
+            self.add(username, email)
+            seen.add(user_id)
+            self.gaps.pop(user_id, None)
+            self.cursor = max(self.cursor, user_id)
+        now = time.monotonic()
+        for missing in range(previous_cursor + 1, self.cursor):
+            if missing not in seen and len(self.gaps) < MAX_TRACKED_GAPS:
+                self.gaps[missing] = now + GAP_TIMEOUT_SECONDS
+        for missing, give_up_at in list(self.gaps.items()):
+            if give_up_at <= now:
+                del self.gaps[missing]
+        self.synced_rows += len(rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 3),
+            "filter_negatives": self.filter_negatives,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+            "synced_rows": self.synced_rows,
+            **(self._filter.stats() if self._filter is not None else {}),
+        }
+
+
+availability_index = AvailabilityIndex(
+    capacity=settings.AVAILABILITY_FILTER_CAPACITY,
+    error_rate=settings.AVAILABILITY_FILTER_ERROR_RATE,
+)
+metrics.stats_collector(
+    "availability_filter", availability_index.stats,
+    counters=("filter_negatives", "db_checks", "false_positives", "synced_rows"),
+    gauges=("ready", "count", "size_bytes", "estimated_false_positive_rate", "build_seconds"),
+)
+
+
+async def is_username_available(db: AsyncSession, username: str) -> bool:
+    if availability_index.ready and not availability_index.might_contain_username(username):
+        availability_index.filter_negatives += 1
+        return True
+    availability_index.db_checks += 1
+    result = await db.execute(select(models.User.id).where(models.User.username == username).limit(1))
+    taken = result.first() is not None
+    if not taken and availability_index.ready:
+        availability_index.false_positives += 1
+    return not taken
+
+
+async def is_email_available(db: AsyncSession, email: str) -> bool:
+    email = normalize_email(email)
+    if availability_index.ready and not availability_index.might_contain_email(email):
+        availability_index.filter_negatives += 1
+        return True
+    availability_index.db_checks += 1
+    result = await db.execute(select(models.User.id).where(models.User.email == email).limit(1))
+    taken = result.first() is not None
+    if not taken and availability_index.ready:
+        availability_index.false_positives += 1
+    return not taken
+
+
+async def run_refresher(session_factory: async_sessionmaker, stop_event: asyncio.Event) -> None:
+    """
+    Builds the filter, polls for new users every AVAILABILITY_FILTER_SYNC_SECONDS and
+    rebuilds it every AVAILABILITY_FILTER_REFRESH_SECONDS (0: never).
+    """
+    built_at = None
+    while not stop_event.is_set():
+        try:
+            async with session_factory() as db:
+                refresh = settings.AVAILABILITY_FILTER_REFRESH_SECONDS
+                if built_at is None or (refresh > 0 and time.monotonic() - built_at >= refresh):
+                    await availability_index.rebuild(db)
+                    built_at = time.monotonic()
+                else:
+                    await availability_index.sync(db)
+        except Exception:
+            logger.exception("Availability filter update failed; retrying")
+        if settings.AVAILABILITY_FILTER_SYNC_SECONDS <= 0: # Build once; other workers' rows are missed
+            return
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.AVAILABILITY_FILTER_SYNC_SECONDS)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,299 @@
+# backend/app/users/bulk_import.py
+"""
+Streaming bulk import of users from CSV or NDJSON.
+
+Input is consumed record by record (never loaded whole), validated with
+schemas.UserImportRow, and written in batches of BULK_IMPORT_BATCH_SIZE with one
+INSERT ... ON CONFLICT DO NOTHING RETURNING per batch. Rows whose username or
+email already exists are skipped and reported as conflicts.
+
+Rows are validated and plain passwords bcrypt-hashed on a process pool
+(BULK_IMPORT_HASH_WORKERS); rows carrying a bcrypt hash in hashed_password are
+stored as-is, which is the fast path for migrations (thousands of rows per second).
+Preparing the next batch overlaps with the insert of the previous one.
+
+Imported users get no verification email; set is_verified_email in the input
+for addresses that were already verified in the source system.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.users import models
+from app.users.availability import availability_index
+from app.users.schemas import BulkImportReport, BulkImportRowError, UserImportRow
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# (line number, parsed record or None when the line could not be parsed, parse error)
+RawRecord = Tuple[int, Optional[dict], Optional[str]]
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    # Separate from the request-path PasswordHashingPool so an import never starves logins.
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=max(1, settings.BULK_IMPORT_HASH_WORKERS))
+    return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
+# --- Input parsing ---
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a byte stream (e.g. request.stream()) into decoded lines, ends included."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # The last piece may be an incomplete line; keep it for the next chunk.
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def aiter_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    """Adapts a file object (or any line iterable) for the CLI."""
+    for line in lines:
+        yield line
+
+
+async def _iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[RawRecord]:
+    header: Optional[List[str]] = None
+    record = ""
+    line_no = 0
+    async for line in lines:
+        record += line
+        # A quoted field may contain newlines: wait until the quotes balance.
+        if record.count('"') % 2:
+            continue
+        line_no += 1
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_no, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells fall back to the schema defaults
+        yield line_no, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record.strip():
+        yield line_no + 1, None, "Unterminated quoted field"
+
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[RawRecord]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(value, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, value, None
+
+
+def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[RawRecord]:
+    if fmt == "csv":
+        return _iter_csv(lines)
+    if fmt == "ndjson":
+        return _iter_ndjson(lines)
+    raise ValueError(f"Unknown import format {fmt!r}; expected one of {IMPORT_FORMATS}")
+
+
+# --- Import ---
+
+def _prepare_chunk(records: List[RawRecord]) -> List[Tuple[int, Optional[str], Optional[dict], Optional[str]]]:
+    """
+    Runs in a pool process. Returns (line, username, column values or None, error or None)
+    per record; plain passwords are bcrypt-hashed, bcrypt hashes are kept as-is.
+    """
+    prepared = []
+    for line, raw, parse_error in records:
+        if parse_error is not None:
+            prepared.append((line, None, None, parse_error))
+            continue
+        try:
+            row = UserImportRow.model_validate(raw)
+        except ValidationError as e:
+            prepared.append((line, raw.get("username"), None, "; ".join(err["msg"] for err in e.errors())))
+            continue
+        prepared.append((line, row.username, {
+            "username": row.username,
+            "email": row.email,
+            "hashed_password": row.hashed_password or get_password_hash(row.password),
+            "is_active": row.is_active,
+            "is_verified_email": row.is_verified_email,
+            "is_superuser": row.is_superuser,
+        }, None))
+    return prepared
+
+
+class _Importer:
+    def __init__(self, db: AsyncSession, batch_size: int, max_reported_errors: int):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.max_reported_errors = max_reported_errors
+        self.report = BulkImportReport()
+        dialect = db.bind.dialect.name
+        self._insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    def _error(self, line: int, username: Optional[str], error: str) -> None:
+        if len(self.report.errors) < self.max_reported_errors:
+            self.report.errors.append(BulkImportRowError(line=line, username=username, error=error))
+        else:
+            self.report.errors_truncated = True
+
+    async def _prepare(self, batch: List[RawRecord]) -> List[Tuple[int, dict]]:
+        """
+        Validates and hashes a batch on the process pool (email validation costs about
+        as much per row as the INSERT, so it is parallelised too), then drops in-batch
+        duplicates.
+        """
+        loop = asyncio.get_running_loop()
+        executor = _get_hash_executor()
+        workers = max(1, settings.BULK_IMPORT_HASH_WORKERS)
+        chunk_size = -(-len(batch) // workers) # ceil
+        chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+        results = await asyncio.gather(*(loop.run_in_executor(executor, _prepare_chunk, chunk) for chunk in chunks))
+
+        rows: List[Tuple[int, dict]] = []
+        usernames, emails = set(), set()
+        for chunk_result in results:
+            for line, username, values, error in chunk_result:
+                if error is not None:
+                    self.report.invalid += 1
+                    self._error(line, username, error)
+                    continue
+                if values["username"] in usernames or values["email"] in emails:
+                    # Would lose the ON CONFLICT race to the earlier row anyway
+                    self.report.conflicts += 1
+                    self._error(line, username, "Duplicate username or email earlier in the input")
+                    continue
+                usernames.add(values["username"])
+                emails.add(values["email"])
+                rows.append((line, values))
+        return rows
+
+    async def _insert_batch(self, rows: List[Tuple[int, dict]]) -> None:
+        if not rows:
+            return
+        table = models.User.__table__
+        result = await self.db.execute(
+            self._insert(table).on_conflict_do_nothing().returning(table.c.username, table.c.email),
+            [values for _, values in rows],
+        )
+        inserted = set()
+        for username, email in result:
+            inserted.add(username)
+            availability_index.add(username, email)
+        skipped = [(line, values) for line, values in rows if values["username"] not in inserted]
+        if skipped:
+            # Rare path: look up which unique column each skipped row collided with.
+            existing = await self.db.execute(
+                select(table.c.username, table.c.email).where(or_(
+                    table.c.username.in_([v["username"] for _, v in skipped]),
+                    table.c.email.in_([v["email"] for _, v in skipped]),
+                ))
+            )
+            taken_usernames, taken_emails = set(), set()
+            for username, email in existing:
+                taken_usernames.add(username)
+                taken_emails.add(email)
+            for line, values in skipped:
+                if values["username"] in taken_usernames:
+                    error = "Username already registered"
+                elif values["email"] in taken_emails:
+                    error = "Email already registered"
+                else:
+                    error = "Conflicts with an existing user"
+                self._error(line, values["username"], error)
+        await self.db.commit()
+        self.report.inserted += len(inserted)
+        self.report.conflicts += len(skipped)
+
+    async def run(self, records: AsyncIterator[RawRecord]) -> BulkImportReport:
+        started = time.perf_counter()
+        pending_insert: Optional[asyncio.Task] = None
+        batch: List[RawRecord] = []
+
+        async def flush(batch: List[RawRecord]) -> None:
+            nonlocal pending_insert
+            prepared = await self._prepare(batch) # Overlaps with the previous batch's insert
+            if pending_insert is not None:
+                await pending_insert
+            pending_insert = asyncio.create_task(self._insert_batch(prepared))
+
+        try:
+            async for record in records:
+                self.report.received += 1
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+            if pending_insert is not None:
+                await pending_insert
+        except BaseException:
+            if pending_insert is not None and not pending_insert.done():
+                pending_insert.cancel()
+            raise
+
+        self.report.seconds = round(time.perf_counter() - started, 3)
+        if self.report.seconds:
+            self.report.rows_per_second = round(self.report.received / self.report.seconds, 1)
+        return self.report
+
+
+async def import_users(
+    db: AsyncSession,
+    lines: AsyncIterator[str],
+    fmt: str,
+    batch_size: Optional[int] = None,
+    max_reported_errors: Optional[int] = None,
+) -> BulkImportReport:
+    """
+    Imports users from decoded input lines (see iter_lines / aiter_lines).
+    Each batch is committed on its own, so rows of earlier batches stay imported
+    if a later batch fails.
+    """
+    importer = _Importer(
+        db,
+        batch_size=batch_size or settings.BULK_IMPORT_BATCH_SIZE,
+        max_reported_errors=(
+            settings.BULK_IMPORT_MAX_REPORTED_ERRORS if max_reported_errors is None else max_reported_errors
+        ),
+    )
+    return await importer.run(iter_records(lines, fmt))
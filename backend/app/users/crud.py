@@ -1,109 +1,551 @@
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
+import base64
+import hmac
+import json
+import re
 import secrets
 from datetime import datetime, timedelta, timezone # Ensure timezone for tz-aware datetimes
 
 # Corrected imports using 'app.' prefix
 from app.users import models
 from app.users import schemas # Though not directly used in all new functions, good to keep if file grows
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.core.action_tokens import (
+    PURPOSE_EMAIL_VERIFICATION,
+    PURPOSE_PASSWORD_RESET,
+    create_action_token,
+    fingerprint,
+    is_action_token,
+    read_action_token,
+)
+from app.users.availability import availability_index
+from app.db.database import read_your_writes
+from app.db.replicas import replica_execute
+from app.users.revocation import revocation_list
+from app.core.exceptions import EmailAlreadyExistsException, InvalidPaginationCursor, UsernameAlreadyExistsException
 
 # Placeholder for token expiry settings (can be moved to config.py later if needed)
-EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS = 48 # Not used if email_verification_token_expiry is omitted from model/logic
+EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS = 48 # Applies to stateless tokens only; stored ones do not expire
 PASSWORD_RESET_TOKEN_EXPIRE_HOURS = 1
 
 
+def utcnow() -> datetime:
+    # DateTime columns are "without time zone": store and compare naive UTC values.
+    # (asyncpg rejects tz-aware values for them, and SQLite hands back naive ones.)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 # --- Existing CRUD functions (adjusted for corrected imports) ---
+# All functions take an AsyncSession and must be awaited.
 
-def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
+# The three lookups below may be served by a read replica (app/db/replicas.py) unless
+# the user was written recently (_note_user_write and run_revocation_sync record those
+# writes) or the caller passes replica=False.
 
-def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.username == username).first()
+async def get_user(db: AsyncSession, user_id: int, replica: bool = True) -> Optional[models.User]:
+    result = await replica_execute(
+        db, select(models.User).where(models.User.id == user_id), [f"id:{user_id}"], replica=replica
+    )
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_username(db: AsyncSession, username: str, replica: bool = True) -> Optional[models.User]:
+    result = await replica_execute(
+        db, select(models.User).where(models.User.username == username), [f"u:{username}"], replica=replica
+    )
+    return result.scalars().first()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User: # Return type changed to non-optional based on typical usage
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-        # is_active is True by default in model
-        # is_verified_email is False by default in model
+async def get_user_by_email(db: AsyncSession, email: str, replica: bool = True) -> Optional[models.User]:
+    result = await replica_execute(
+        db, select(models.User).where(models.User.email == email), [f"e:{email}"], replica=replica
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    return result.scalars().first()
+
+def _note_user_write(user: models.User) -> None:
+    read_your_writes.note(f"id:{user.id}", f"u:{user.username}", f"e:{user.email}")
+
+# Matches the violated unique column in PostgreSQL ('... constraint "ix_users_email"') and
+# SQLite ('UNIQUE constraint failed: users.email') error messages.
+_USER_CONFLICT_PATTERN = re.compile(r"\b(?:ix_users_|users\.)(username|email)\b")
+
+def _user_conflict_exception(error: IntegrityError) -> Optional[Exception]:
+    match = _USER_CONFLICT_PATTERN.search(str(error.orig))
+    if not match:
+        return None
+    if match.group(1) == "username":
+        return UsernameAlreadyExistsException()
+    return EmailAlreadyExistsException()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    """
+    Registers a user in one INSERT ... RETURNING that already carries the email
+    verification token, and queues the verification email in the same transaction.
+    Duplicates are detected from the unique-constraint violation, so there are no
+    racy existence pre-checks; raises UsernameAlreadyExistsException / EmailAlreadyExistsException.
+    """
+    hashed_password = await get_password_hash_async(user.password)
+    stored_token = None if settings.STATELESS_ACTION_TOKENS else generate_secure_token()
+    try:
+        result = await db.execute(
+            insert(models.User)
+            .values(
+                username=user.username,
+                email=user.email,
+                hashed_password=hashed_password,
+                email_verification_token=stored_token,
+                # is_active is True by default in model
+                # is_verified_email is False by default in model
+            )
+            .returning(models.User)
+        )
+        db_user = result.scalars().one()
+        # A stateless token needs the new id, which RETURNING has just handed back.
+        token = stored_token or _issue_action_token(db_user, PURPOSE_EMAIL_VERIFICATION)
+        enqueue_email(db, EMAIL_KIND_VERIFICATION, db_user.email, {"username": db_user.username, "token": token})
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        conflict = _user_conflict_exception(e)
+        if conflict is None:
+            raise
+        raise conflict from None
+    availability_index.add(db_user.username, db_user.email)
+    _note_user_write(db_user)
     return db_user
 
+def _invalidate_principal(user: models.User) -> None:
+    # Drop the cached principal so the next authenticated request reloads the row,
+    # from the primary while the replicas may still lag behind this write.
+    principal_cache.invalidate(user.username)
+    _note_user_write(user)
+
+async def set_user_active(db: AsyncSession, user: models.User, is_active: bool) -> models.User:
+    user.is_active = is_active
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    _invalidate_principal(user)
+    return user
+
+async def set_user_superuser(db: AsyncSession, user: models.User, is_superuser: bool) -> models.User:
+    user.is_superuser = is_superuser
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    _invalidate_principal(user)
+    return user
+
+# --- Admin listing and export ---
+# Keyset (seek) pagination: each page continues after the last row of the previous one
+# via WHERE (sort key) > (cursor), served from the id primary key or the
+# ix_users_created_at_id index, so page N costs the same as page 1 (no OFFSET).
+USER_SORT_KEYS = ("id", "created_at")
+
+# Columns of schemas.UserAdminRead; the export selects only these.
+USER_EXPORT_COLUMNS = (
+    models.User.id,
+    models.User.username,
+    models.User.email,
+    models.User.is_active,
+    models.User.is_verified_email,
+    models.User.is_superuser,
+    models.User.created_at,
+    models.User.updated_at,
+)
+
+def _user_filters(is_active: Optional[bool], is_verified_email: Optional[bool]) -> list:
+    filters = []
+    if is_active is not None:
+        filters.append(models.User.is_active == is_active)
+    if is_verified_email is not None:
+        filters.append(models.User.is_verified_email == is_verified_email)
+    return filters
+
+def _user_order(sort: str) -> tuple:
+    if sort == "created_at":
+        return (models.User.created_at, models.User.id)
+    return (models.User.id,)
+
+def encode_user_cursor(user: models.User, sort: str) -> str:
+    key = {"id": user.id}
+    if sort == "created_at":
+        key["created_at"] = user.created_at.isoformat()
+    raw = json.dumps({"sort": sort, **key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _decode_user_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if key["sort"] != sort:
+            raise InvalidPaginationCursor(detail="Cursor was issued for a different sort order.")
+        if sort == "created_at":
+            return (datetime.fromisoformat(key["created_at"]), int(key["id"]))
+        return (int(key["id"]),)
+    except InvalidPaginationCursor:
+        raise
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPaginationCursor()
+
+async def list_users_page(
+    db: AsyncSession,
+    limit: int,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_verified_email: Optional[bool] = None,
+) -> Tuple[List[models.User], Optional[str]]:
+    """Returns up to `limit` users after `cursor`, and the cursor of the next page (None if last)."""
+    order = _user_order(sort)
+    stmt = select(models.User).where(*_user_filters(is_active, is_verified_email))
+    if cursor:
+        after = _decode_user_cursor(cursor, sort)
+        if sort == "created_at" and db.bind.dialect.name == "sqlite":
+            # SQLite stores server-side now() as 'YYYY-MM-DD HH:MM:SS' text but binds Python
+            # datetimes with microseconds; normalise the bound value so text comparison holds.
+            after = (func.datetime(after[0]), after[1])
+        stmt = stmt.where(tuple_(*order) > tuple_(*after))
+    # One extra row tells whether another page exists without a COUNT.
+    result = await db.execute(stmt.order_by(*order).limit(limit + 1))
+    users = list(result.scalars().all())
+    if len(users) <= limit:
+        return users, None
+    users = users[:limit]
+    return users, encode_user_cursor(users[-1], sort)
+
+async def stream_users(
+    db: AsyncSession,
+    sort: str = "id",
+    is_active: Optional[bool] = None,
+    is_verified_email: Optional[bool] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[List[dict]]:
+    """
+    Yields users as lists of column dicts, `batch_size` rows at a time, from a
+    server-side cursor (yield_per), so memory stays constant however many rows match.
+    """
+    result = await db.stream(
+        select(*USER_EXPORT_COLUMNS)
+        .where(*_user_filters(is_active, is_verified_email))
+        .order_by(*_user_order(sort))
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
 # --- New functions for email verification and password reset ---
 
 def generate_secure_token(length: int = 32) -> str:
     return secrets.token_urlsafe(length)
 
+# With STATELESS_ACTION_TOKENS the tokens are signed payloads (app/core/action_tokens.py):
+# issuing one writes nothing to the user row, and redeeming one is a primary-key fetch.
+# Tokens of either kind are accepted, so the mode can be switched with links in flight.
+_ACTION_TOKEN_LIFETIMES = {
+    PURPOSE_EMAIL_VERIFICATION: timedelta(hours=EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS),
+    PURPOSE_PASSWORD_RESET: timedelta(hours=PASSWORD_RESET_TOKEN_EXPIRE_HOURS),
+}
+
+def _action_token_state(user: models.User, purpose: str) -> str:
+    # The state a token is bound to; acting on the token changes it, which makes it single-use.
+    if purpose == PURPOSE_EMAIL_VERIFICATION:
+        return f"{user.email}|{int(bool(user.is_verified_email))}"
+    # Moved by every reset (and revoke-all), but not by the re-hash on login, which
+    # rewrites hashed_password without the user noticing
+    valid_after = user.tokens_valid_after
+    return f"valid_after|{valid_after.isoformat() if valid_after is not None else ''}"
+
+def _action_token_states(user: models.User, purpose: str) -> List[str]:
+    states = [_action_token_state(user, purpose)]
+    if purpose == PURPOSE_PASSWORD_RESET:
+        # Links issued before reset tokens moved off the password hash; they expire
+        # within PASSWORD_RESET_TOKEN_EXPIRE_HOURS of the upgrade
+        states.append(user.hashed_password)
+    return states
+
+def _issue_action_token(user: models.User, purpose: str) -> str:
+    return create_action_token(user.id, purpose, _action_token_state(user, purpose), _ACTION_TOKEN_LIFETIMES[purpose])
+
+async def _get_user_by_action_token(db: AsyncSession, token: str, purpose: str) -> Optional[models.User]:
+    payload = read_action_token(token, purpose)
+    if payload is None:
+        return None
+    user = await db.get(models.User, payload["uid"])
+    if user is None:
+        return None
+    token_fp = str(payload.get("fp"))
+    if not any(hmac.compare_digest(token_fp, fingerprint(purpose, state))
+               for state in _action_token_states(user, purpose)):
+        return None
+    return user
+
 # --- Email Verification ---
-def set_email_verification_token(db: Session, user: models.User) -> models.User:
-    token = generate_secure_token()
-    user.email_verification_token = token
-    # user.email_verification_token_expiry = datetime.now(timezone.utc) + timedelta(hours=EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS) # Omitted as per instruction
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+async def set_email_verification_token(db: AsyncSession, user: models.User) -> models.User:
+    if settings.STATELESS_ACTION_TOKENS:
+        token = _issue_action_token(user, PURPOSE_EMAIL_VERIFICATION)
+    else:
+        token = generate_secure_token()
+        user.email_verification_token = token
+        # user.email_verification_token_expiry = datetime.now(timezone.utc) + timedelta(hours=EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS) # Omitted as per instruction
+        db.add(user)
+    enqueue_email(db, EMAIL_KIND_VERIFICATION, user.email, {"username": user.username, "token": token})
+    await db.commit()
+    if not settings.STATELESS_ACTION_TOKENS:
+        await db.refresh(user)
+        _invalidate_principal(user)
     return user
 
-def get_user_by_email_verification_token(db: Session, token: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email_verification_token == token).first()
+async def get_user_by_email_verification_token(db: AsyncSession, token: str) -> Optional[models.User]:
+    if is_action_token(token):
+        return await _get_user_by_action_token(db, token, PURPOSE_EMAIL_VERIFICATION)
+    result = await db.execute(select(models.User).where(models.User.email_verification_token == token))
+    return result.scalars().first()
 
-def verify_user_by_email_token(db: Session, token: str) -> Optional[models.User]:
-    user = get_user_by_email_verification_token(db, token)
+async def verify_user_by_email_token(db: AsyncSession, token: str) -> Optional[models.User]:
+    user = await get_user_by_email_verification_token(db, token)
     if user:
         # Optional: Check token expiry if implemented
         # if user.email_verification_token_expiry and user.email_verification_token_expiry < datetime.now(timezone.utc): # Omitted
         #     # Token expired, clear it or handle as needed
         #     user.email_verification_token = None
         #     # user.email_verification_token_expiry = None # Omitted
-        #     db.commit()
-        #     return None 
+        #     await db.commit()
+        #     return None
         user.is_verified_email = True
         user.email_verification_token = None # Clear token after use
         # user.email_verification_token_expiry = None # Omitted
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        _invalidate_principal(user)
         return user
     return None
 
 # --- Password Reset ---
-def set_password_reset_token(db: Session, user: models.User) -> models.User:
-    token = generate_secure_token()
-    user.password_reset_token = token
-    user.password_reset_token_expiry = datetime.now(timezone.utc) + timedelta(hours=PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+async def set_password_reset_token(db: AsyncSession, user: models.User) -> models.User:
+    if settings.STATELESS_ACTION_TOKENS:
+        token = _issue_action_token(user, PURPOSE_PASSWORD_RESET)
+    else:
+        token = generate_secure_token()
+        user.password_reset_token = token
+        user.password_reset_token_expiry = utcnow() + timedelta(hours=PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
+        db.add(user)
+    enqueue_email(db, EMAIL_KIND_PASSWORD_RESET, user.email, {"username": user.username, "token": token})
+    await db.commit()
+    if not settings.STATELESS_ACTION_TOKENS:
+        await db.refresh(user)
+        _invalidate_principal(user)
     return user
 
-def get_user_by_password_reset_token(db: Session, token: str) -> Optional[models.User]:
-    user = db.query(models.User).filter(models.User.password_reset_token == token).first()
+async def get_user_by_password_reset_token(db: AsyncSession, token: str) -> Optional[models.User]:
+    if is_action_token(token):
+        # Expiry is checked against the signed exp: nothing to clear, no write on this read path.
+        return await _get_user_by_action_token(db, token, PURPOSE_PASSWORD_RESET)
+    result = await db.execute(select(models.User).where(models.User.password_reset_token == token))
+    user = result.scalars().first()
     if user:
-        if user.password_reset_token_expiry and user.password_reset_token_expiry < datetime.now(timezone.utc):
+        if user.password_reset_token_expiry and user.password_reset_token_expiry < utcnow():
             # Token expired, clear it
             user.password_reset_token = None
             user.password_reset_token_expiry = None
             db.add(user) # Persist the clearing of the token
-            db.commit()
+            await db.commit()
+            _invalidate_principal(user)
             return None # Effectively, user not found with a valid token
         return user
     return None
 
-def reset_user_password(db: Session, user: models.User, new_password: str) -> models.User:
-    user.hashed_password = get_password_hash(new_password)
+async def upgrade_password_hash(db: AsyncSession, user_id: int, old_hash: str, password: str) -> bool:
+    """
+    Replaces a verified password's hash with one at the current bcrypt cost.
+    The UPDATE only applies while the row still holds `old_hash`, so a password
+    reset that lands in between wins. updated_at is left alone: the user's visible
+    data (and /auth/me's ETag) do not change. Returns whether a row was updated.
+    """
+    new_hash = await get_password_hash_async(password)
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+        .values(hashed_password=new_hash, updated_at=models.User.updated_at)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def reset_user_password(db: AsyncSession, user: models.User, new_password: str) -> models.User:
+    user.hashed_password = await get_password_hash_async(new_password)
     user.password_reset_token = None # Clear token after use
     user.password_reset_token_expiry = None # Clear expiry
-    # Optional: Force logout of other sessions if needed, e.g., by changing a security stamp field
+    await _invalidate_user_tokens(db, user) # Logs out every existing session
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    _invalidate_principal(user)
     return user
+
+# --- Token revocation (see app/users/revocation.py) ---
+def _token_revocation_horizon() -> datetime:
+    # After this, every token issued up to now has expired on its own
+    longest = max(settings.ACCESS_TOKEN_EXPIRE_MINUTES, settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    return utcnow() + timedelta(minutes=longest)
+
+async def _invalidate_user_tokens(db: AsyncSession, user: models.User) -> None:
+    """
+    Moves the user's tokens_valid_after, revokes their refresh token families and
+    adds the feed row for the other workers, in the current transaction; the caller commits.
+    """
+    user.tokens_valid_after = utcnow()
+    db.add(models.TokenRevocation(username=user.username, expires_at=_token_revocation_horizon()))
+    db.add(user)
+    await db.execute(
+        update(models.RefreshTokenFamily)
+        .where(models.RefreshTokenFamily.user_id == user.id)
+        .values(revoked=True)
+    )
+
+async def revoke_user_tokens(db: AsyncSession, user: models.User) -> models.User:
+    """Invalidates every access and refresh token issued to the user so far."""
+    await _invalidate_user_tokens(db, user)
+    await db.commit()
+    await db.refresh(user)
+    _invalidate_principal(user)
+    return user
+
+async def revoke_tokens(db: AsyncSession, payloads: List[dict], family_id: Optional[str] = None) -> int:
+    """
+    Denies verified tokens until their exp and, with family_id, revokes that refresh
+    token family, in one transaction. Tokens that cannot be revoked individually
+    (no jti) and repeats are skipped; returns how many were newly revoked. The change
+    is visible in this worker at once and in the others after their next revocation sync.
+    """
+    tokens = {}
+    for payload in payloads:
+        jti, exp = payload.get("jti"), payload.get("exp")
+        if isinstance(jti, str) and isinstance(exp, (int, float)):
+            tokens[jti] = exp
+    if not tokens and family_id is None:
+        return 0
+    for attempt in range(2):
+        known = set()
+        if tokens:
+            result = await db.execute(
+                select(models.TokenRevocation.jti).where(models.TokenRevocation.jti.in_(list(tokens)))
+            )
+            known = set(result.scalars())
+        fresh = {jti: exp for jti, exp in tokens.items() if jti not in known}
+        for jti, exp in fresh.items():
+            expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+            db.add(models.TokenRevocation(jti=jti, username=None, expires_at=expires_at))
+        if family_id is not None:
+            await db.execute(
+                update(models.RefreshTokenFamily)
+                .where(models.RefreshTokenFamily.id == family_id)
+                .values(revoked=True)
+            )
+        try:
+            await db.commit()
+        except IntegrityError: # Revoked concurrently; the retry sees it as known
+            await db.rollback()
+            if attempt:
+                raise
+            continue
+        for jti, exp in fresh.items():
+            revocation_list.add(jti, exp)
+        return len(fresh)
+
+async def revoke_token(db: AsyncSession, payload: dict) -> bool:
+    """Denies one verified token (see revoke_tokens); False if it has no jti or was already revoked."""
+    return await revoke_tokens(db, [payload]) == 1
+
+async def list_token_revocations(
+    db: AsyncSession, after_id: int, ids: List[int] = ()
+) -> List[models.TokenRevocation]:
+    """Live rows with an id above after_id or in `ids`, in id order."""
+    newer = models.TokenRevocation.id > after_id
+    result = await db.execute(
+        select(models.TokenRevocation)
+        .where(or_(newer, models.TokenRevocation.id.in_(ids)) if ids else newer,
+               models.TokenRevocation.expires_at > utcnow())
+        .order_by(models.TokenRevocation.id)
+    )
+    return list(result.scalars().all())
+
+async def prune_token_revocations(db: AsyncSession) -> int:
+    result = await db.execute(delete(models.TokenRevocation).where(models.TokenRevocation.expires_at <= utcnow()))
+    await db.commit()
+    return result.rowcount
+
+# --- Refresh token families ---
+async def create_refresh_token_family(db: AsyncSession, user: models.User, lifetime: timedelta) -> models.RefreshTokenFamily:
+    family = models.RefreshTokenFamily(
+        id=generate_secure_token(16), # 22 url-safe chars
+        user_id=user.id,
+        generation=0,
+        revoked=False,
+        expires_at=utcnow() + lifetime,
+    )
+    db.add(family)
+    await db.commit()
+    return family
+
+async def rotate_refresh_token_family(
+    db: AsyncSession, family_id: str, generation: int, lifetime: timedelta
+) -> Optional[int]:
+    """
+    Atomically advances a live family from `generation` to `generation + 1`.
+    Returns the family's user_id, or None if the family is unknown, revoked, expired,
+    or `generation` is stale. A stale generation is a replayed token: the family is revoked.
+    """
+    now = utcnow()
+    result = await db.execute(
+        update(models.RefreshTokenFamily)
+        .where(
+            models.RefreshTokenFamily.id == family_id,
+            models.RefreshTokenFamily.generation == generation,
+            models.RefreshTokenFamily.revoked.is_(False),
+            models.RefreshTokenFamily.expires_at > now,
+        )
+        .values(generation=generation + 1, expires_at=now + lifetime)
+        .returning(models.RefreshTokenFamily.user_id)
+    )
+    user_id = result.scalar_one_or_none()
+    if user_id is not None:
+        await db.commit()
+        return user_id
+
+    await db.rollback()
+    family = await db.get(models.RefreshTokenFamily, family_id)
+    if family is not None and not family.revoked and family.generation != generation:
+        await revoke_refresh_token_family(db, family_id)
+    return None
+
+async def revoke_refresh_token_family(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(models.RefreshTokenFamily)
+        .where(models.RefreshTokenFamily.id == family_id)
+        .values(revoked=True)
+    )
+    await db.commit()
+
+# --- Email outbox ---
+# Outbox kinds, mapped to senders in app/core/outbox_worker.py
+EMAIL_KIND_VERIFICATION = "email_verification"
+EMAIL_KIND_PASSWORD_RESET = "password_reset"
+
+def enqueue_email(db: AsyncSession, kind: str, recipient: str, payload: dict) -> models.EmailOutbox:
+    """
+    Adds an outbox row to the current transaction; it is committed (or rolled back)
+    together with the caller's other changes.
+    """
+    message = models.EmailOutbox(
+        kind=kind,
+        recipient=recipient,
+        payload=payload,
+        status="pending",
+        attempts=0,
+        next_attempt_at=utcnow(),
+    )
+    db.add(message)
+    return message
@@ -0,0 +1,70 @@
+# backend/app/users/manage.py
+"""
+User administration commands. Run from backend/:
+
+    python -m app.users.manage import-users users.csv
+    python -m app.users.manage import-users users.ndjson --batch-size 5000
+    python -m app.users.manage grant-superuser alice
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import List, Optional
+
+from app.db.database import AsyncSessionLocal, dispose_engines
+from app.users import crud
+from app.users.bulk_import import IMPORT_FORMATS, aiter_lines, import_users, shutdown_hash_executor
+
+
+async def _import_users(path: str, fmt: Optional[str], batch_size: Optional[int]) -> int:
+    if fmt is None:
+        fmt = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+    try:
+        async with AsyncSessionLocal() as db:
+            report = await import_users(db, aiter_lines(stream), fmt, batch_size=batch_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(json.dumps(report.model_dump(), indent=2))
+    return 0
+
+
+async def _grant_superuser(username: str, revoke: bool) -> int:
+    async with AsyncSessionLocal() as db:
+        user = await crud.get_user_by_username(db, username=username)
+        if user is None:
+            print(f"No such user: {username}", file=sys.stderr)
+            return 1
+        await crud.set_user_superuser(db, user, not revoke)
+    print(f"{username}: is_superuser={not revoke}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage users.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-users", help="Bulk import users from CSV or NDJSON")
+    imp.add_argument("path", help="Input file, or - for stdin")
+    imp.add_argument("--format", choices=IMPORT_FORMATS, help="Default: from the file extension")
+    imp.add_argument("--batch-size", type=int, help="Default: BULK_IMPORT_BATCH_SIZE")
+    grant = sub.add_parser("grant-superuser", help="Give a user access to the /admin endpoints")
+    grant.add_argument("username")
+    grant.add_argument("--revoke", action="store_true")
+    args = parser.parse_args(argv)
+
+    async def _run() -> int:
+        try:
+            if args.command == "import-users":
+                return await _import_users(args.path, args.format, args.batch_size)
+            return await _grant_superuser(args.username, args.revoke)
+        finally:
+            shutdown_hash_executor()
+            await dispose_engines()
+
+    sys.exit(asyncio.run(_run()))
+
+
+if __name__ == "__main__":
+    main()
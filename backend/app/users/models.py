@@ -1,4 +1,9 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime # Integer might not be needed if id is from TimestampedModel
+import logging
+
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, JSON, Index # Integer might not be needed if id is from TimestampedModel
+from sqlalchemy.sql import func
+
+from app.db.database import Base # For tables that don't need TimestampedModel's columns
 
 # Import TimestampedModel from base_model.py
 # from backend.app.db.base_model import TimestampedModel
@@ -12,9 +17,8 @@ try:
     from app.db.base_model import TimestampedModel # Assuming 'app' is a package
     ParentModel = TimestampedModel
     timestamp_model_fields_present = True # Assume TimestampedModel provides id, created_at, updated_at
-    print("Successfully imported TimestampedModel in users/models.py.")
 except ImportError:
-    print("Warning: Could not import TimestampedModel from app.db.base_model in users/models.py. Falling back to Base.")
+    logging.getLogger(__name__).warning("Could not import TimestampedModel from app.db.base_model in users/models.py. Falling back to Base.")
     from app.db.database import Base # Assuming 'app' is a package - Fallback import
     ParentModel = Base
     # Explicitly define id, created_at, updated_at if not using TimestampedModel
@@ -24,12 +28,15 @@ except ImportError:
 
 class User(ParentModel):
     __tablename__ = "users"
+    # Keyset pagination / export ordered by creation time (crud.list_users_page)
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     # Define common fields
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False) # Consider EmailType from sqlalchemy_utils if available
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False) # Made nullable=False for consistency
+    is_superuser = Column(Boolean, default=False, nullable=False) # Grants the /admin endpoints
 
     # Email verification fields
     is_verified_email = Column(Boolean, default=False, nullable=False)
@@ -39,9 +46,13 @@ class User(ParentModel):
     password_reset_token = Column(String, nullable=True, index=True, unique=True)
     password_reset_token_expiry = Column(DateTime, nullable=True)
 
+    # Tokens issued (iat_us) up to this instant are rejected; moved by password resets
+    # and admin revoke-all (see app/users/revocation.py)
+    tokens_valid_after = Column(DateTime, nullable=True)
+
     # Add id, created_at, updated_at if not inherited from TimestampedModel
     if not timestamp_model_fields_present:
-        print("User model: Adding id, created_at, updated_at fields as TimestampedModel was not used/imported correctly.")
+        logging.getLogger(__name__).warning("User model: Adding id, created_at, updated_at fields as TimestampedModel was not used/imported correctly.")
         id = Column(Integer, primary_key=True, index=True)
         created_at = Column(DateTime, default=func.now())
         updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -51,3 +62,57 @@ class User(ParentModel):
 
     def __repr__(self):
         return f"<User(username='{self.username}', email='{self.email}')>"
+
+
+class RefreshTokenFamily(Base):
+    """
+    One row per login session. Every refresh token of the session carries the family id
+    ("fam") and its generation ("gen"); only the current generation may be exchanged.
+    Presenting an older generation means the token was replayed, and revokes the family.
+    """
+    __tablename__ = "refresh_token_families"
+
+    id = Column(String(32), primary_key=True) # Random, unguessable family id
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    generation = Column(Integer, nullable=False, default=0)
+    revoked = Column(Boolean, nullable=False, default=False)
+    expires_at = Column(DateTime, nullable=False) # Naive UTC, like the other DateTime columns
+    created_at = Column(DateTime, default=func.now())
+
+
+class TokenRevocation(Base):
+    """
+    Revocation feed that every worker mirrors in memory (app/users/revocation.py).
+    A row with a jti denies that one token. A row with a username announces that the
+    user's tokens_valid_after moved, so workers drop their cached principal. Rows stop
+    mattering at expires_at, when every token they cover has expired, and are pruned.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True) # Increasing; the workers' sync cursor
+    jti = Column(String(32), nullable=True, unique=True)
+    username = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True) # Naive UTC
+    created_at = Column(DateTime, default=func.now())
+
+
+class EmailOutbox(Base):
+    """
+    Outgoing emails, written in the same transaction as the token they carry and
+    delivered by app/core/outbox_worker.py. A claimed row is leased by pushing
+    next_attempt_at into the future; if the worker dies, the lease lapses and
+    another worker picks the row up again.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False) # "email_verification" or "password_reset"
+    recipient = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False) # Template arguments, e.g. {"username": ..., "token": ...}
+    status = Column(String(16), nullable=False, default="pending") # "pending", "sent" or "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False) # Naive UTC; claimable once in the past
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime, nullable=True)
@@ -0,0 +1,169 @@
+# backend/app/users/revocation.py
+"""
+Token revocation without a database query per request.
+
+- /auth/logout and POST /admin/users/revoke-token deny a single token by its jti.
+  crud writes a token_revocations row, and each worker keeps the live jtis in
+  `revocation_list`, a hash set with one expiry per entry. get_current_user and
+  /auth/refresh check it with one dict lookup. An entry is dropped once the
+  token's own exp has passed, when the signature check rejects it anyway, so the
+  set never holds more than the tokens revoked within one token lifetime.
+- Password resets and POST /admin/users/{id}/revoke-tokens move the user's
+  tokens_valid_after instead. Tokens issued up to that instant are rejected,
+  compared to the microsecond through the iat_us claim. The check runs against
+  the principal that get_current_user loads anyway.
+
+Other workers learn about revocations from `run_revocation_sync`. It polls the
+table every TOKEN_REVOCATION_SYNC_SECONDS for rows newer than the last one seen.
+For user-level rows it drops the cached principal and marks the user as recently
+written (app/db/replicas.py), so the new tokens_valid_after and password hash are
+read from the primary on that user's next request, not from a lagging replica. Until the next poll, a revoked token may
+still be accepted by a worker that did not handle the revocation.
+The worker that handled it applies the revocation at once.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import metrics
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.db.database import read_your_writes
+
+logger = logging.getLogger(__name__)
+
+# Out-of-order commits are waited for this long (well above any revoke transaction)
+GAP_TIMEOUT_SECONDS = 60.0
+MAX_TRACKED_GAPS = 1000
+
+
+class RevocationList:
+    """
+    Revoked jtis, each kept until its token's exp (wall-clock seconds).
+    Lookups are O(1); expired entries leave through a heap ordered by exp.
+    Only touched from the event loop thread.
+    """
+
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self.added = 0
+        self.rejected = 0
+        self.pruned = 0
+
+    def add(self, jti: str, exp: float) -> None:
+        if exp <= time.time() or jti in self._expires:
+            return
+        self._expires[jti] = exp
+        heapq.heappush(self._heap, (exp, jti))
+        self.added += 1
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        exp = self._expires.get(jti)
+        if exp is None:
+            return False
+        self.rejected += 1
+        return True
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, jti = heapq.heappop(self._heap)
+            del self._expires[jti]
+            removed += 1
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._expires), "added": self.added, "rejected": self.rejected, "pruned": self.pruned}
+
+
+revocation_list = RevocationList()
+metrics.stats_collector(
+    "token_revocation_list", revocation_list.stats,
+    counters=("added", "rejected", "pruned"), gauges=("size",),
+)
+
+
+def utc_timestamp(naive_utc: datetime) -> float:
+    # DateTime columns hold naive UTC (see crud.utcnow)
+    return naive_utc.replace(tzinfo=timezone.utc).timestamp()
+
+
+def is_token_revoked(payload: Mapping[str, Any], user: Any) -> bool:
+    """True if the token's jti was revoked or it was issued no later than the user's tokens_valid_after."""
+    if revocation_list.is_revoked(payload.get("jti")):
+        return True
+    valid_after = getattr(user, "tokens_valid_after", None)
+    if valid_after is None:
+        return False
+    valid_after_us = int(valid_after.replace(tzinfo=timezone.utc).timestamp()) * 1_000_000 + valid_after.microsecond
+    iat_us = payload.get("iat_us")
+    if isinstance(iat_us, int):
+        return iat_us <= valid_after_us
+    iat = payload.get("iat")
+    # Tokens without iat predate revocation support and cannot be dated: reject them.
+    # Whole-second iat alone cannot order a token within the revocation's second,
+    # so that whole second is rejected.
+    return not isinstance(iat, (int, float)) or iat < math.ceil(valid_after_us / 1_000_000)
+
+
+async def run_revocation_sync(session_factory: async_sessionmaker, stop_event: asyncio.Event) -> None:
+    """
+    Loads the live revocations, then applies new ones every TOKEN_REVOCATION_SYNC_SECONDS
+    (0: load once). Expired rows are deleted every TOKEN_REVOCATION_PRUNE_SECONDS.
+    """
+    from app.users import crud # crud imports this module
+
+    cursor = 0
+    loaded = False
+    # Ids below the cursor not seen yet: a transaction that took an id earlier may
+    # commit after a later one was read. Re-queried until they show up or time out
+    # (most are ids of rolled-back inserts that never will).
+    gaps: Dict[int, float] = {}
+    last_pruned = time.monotonic()
+    while not stop_event.is_set():
+        try:
+            async with session_factory() as db:
+                rows = await crud.list_token_revocations(db, after_id=cursor, ids=list(gaps))
+                previous_cursor = cursor
+                seen = set()
+                for row in rows:
+                    if row.jti is not None:
+                        revocation_list.add(row.jti, utc_timestamp(row.expires_at))
+                    if row.username is not None and loaded: # Nothing is cached before the first load
+                        principal_cache.invalidate(row.username)
+                        read_your_writes.note(f"u:{row.username}")
+                    seen.add(row.id)
+                    gaps.pop(row.id, None)
+                    cursor = max(cursor, row.id)
+                now = time.monotonic()
+                if loaded:
+                    for missing in range(previous_cursor + 1, cursor):
+                        if missing not in seen and len(gaps) < MAX_TRACKED_GAPS:
+                            gaps[missing] = now + GAP_TIMEOUT_SECONDS
+                for missing, give_up_at in list(gaps.items()):
+                    if give_up_at <= now:
+                        del gaps[missing]
+                loaded = True
+                if now - last_pruned >= settings.TOKEN_REVOCATION_PRUNE_SECONDS:
+                    await crud.prune_token_revocations(db)
+                    last_pruned = time.monotonic()
+            revocation_list.prune()
+        except Exception:
+            logger.exception("Token revocation sync failed; retrying")
+        if settings.TOKEN_REVOCATION_SYNC_SECONDS <= 0:
+            return
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.TOKEN_REVOCATION_SYNC_SECONDS)
+        except asyncio.TimeoutError:
+            pass
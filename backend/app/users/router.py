@@ -1,67 +1,85 @@
+import hashlib
+import logging
+from datetime import timedelta
 from typing import Any, Optional 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks # Added BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Corrected imports using 'app.' prefix
 from app.users import crud
 from app.users import models
 from app.users import schemas
-from app.core.security import create_access_token, create_refresh_token, verify_password
-from app.core.dependencies import get_db, get_current_active_user, get_current_user # get_current_user might be needed for other endpoints
+from app.users.availability import is_email_available, is_username_available
+from app.core.config import settings
+from app.core.rate_limit import check_login_rate_limit, record_failed_login
+from app.core.responses import etag_matches, json_response, not_modified
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    password_hashing_pool,
+    password_needs_rehash,
+    verify_password_async,
+    REFRESH_TOKEN_TYPE,
+)
+from app.db.database import AsyncSessionLocal
+from app.core.dependencies import get_db, get_current_active_user, get_current_user, get_principal, oauth2_scheme # get_current_user might be needed for other endpoints
+from app.users.revocation import is_token_revoked
 
-# New imports for email verification and password reset
-from app.core.email_service import send_email_verification_email, send_password_reset_email
+# Verification and reset emails are queued in the email_outbox table by crud (same
+# transaction as the token) and delivered by app/core/outbox_worker.py.
 from app.core.exceptions import (
     UserNotFoundException, 
     EmailVerificationTokenInvalid, 
     PasswordResetTokenInvalid, 
     UserAlreadyVerifiedException,
-    EmailAlreadyExistsException, # For register endpoint
-    UsernameAlreadyExistsException # For register endpoint
+    InvalidTokenException,
+    PasswordHashingUnavailable,
 )
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user: schemas.UserCreate, 
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks() # Added for sending verification email
+    db: AsyncSession = Depends(get_db),
 ):
-    db_user_by_username = crud.get_user_by_username(db, username=user.username)
-    if db_user_by_username:
-        raise UsernameAlreadyExistsException() # Using custom exception
+    # Single INSERT ... RETURNING with the verification token; duplicates raise
+    # UsernameAlreadyExistsException / EmailAlreadyExistsException from the unique constraints.
+    created_user = await crud.create_user(db=db, user=user)
+    return json_response(schemas.UserRead, created_user, status_code=status.HTTP_201_CREATED)
 
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
-    if db_user_by_email:
-        raise EmailAlreadyExistsException() # Using custom exception
-    
-    created_user = crud.create_user(db=db, user=user)
-    
-    # Set verification token and send email
-    token_user = crud.set_email_verification_token(db, user=created_user)
-    if not token_user.email_verification_token:
-        # This case should ideally not happen if token generation is robust
-        # Log an error here
-        print(f"Error: Could not generate verification token for user {token_user.id}")
-        # Optionally, raise an HTTPException if this is critical, 
-        # or proceed without verification if system allows (not recommended)
-    else:
-        background_tasks.add_task(
-            send_email_verification_email,
-            recipient_email=token_user.email,
-            username=token_user.username,
-            token=token_user.email_verification_token
-        )
-    return created_user
+
+@router.get("/availability", response_model=schemas.AvailabilityResponse)
+async def check_availability(
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Answered from the in-memory Bloom filter unless it reports a possible match,
+    # in which case one indexed lookup confirms it (see app/users/availability.py).
+    return schemas.AvailabilityResponse(
+        username_available=await is_username_available(db, username) if username else None,
+        email_available=await is_email_available(db, email) if email else None,
+    )
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: schemas.LoginCredentials, db: Session = Depends(get_db)):
-    user_obj = crud.get_user_by_username(db, username=form_data.username)
+async def login_for_access_token(
+    request: Request,
+    form_data: schemas.LoginCredentials,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
+    # Throttle per client IP and per username (failed attempts) before any DB lookup or bcrypt work
+    check_login_rate_limit(request, form_data.username)
+    user_obj = await crud.get_user_by_username(db, username=form_data.username)
     
-    if not user_obj or not verify_password(form_data.password, user_obj.hashed_password):
+    if not user_obj or not await verify_password_async(form_data.password, user_obj.hashed_password):
+        record_failed_login(form_data.username)
         raise HTTPException( # Keeping standard HTTPException for login failure
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password.",
@@ -70,27 +88,127 @@ async def login_for_access_token(form_data: schemas.LoginCredentials, db: Sessio
     if not user_obj.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user") # Standard HTTPException
     
-    access_token = create_access_token(data={"sub": user_obj.username})
-    refresh_token = create_refresh_token(data={"sub": user_obj.username})
+    if settings.PASSWORD_REHASH_ON_LOGIN and password_needs_rehash(user_obj.hashed_password):
+        # Hash stored at another bcrypt cost: re-hash after the response is sent
+        background_tasks.add_task(_upgrade_password_hash, user_obj.id, user_obj.hashed_password, form_data.password)
+    family = await crud.create_refresh_token_family(db, user=user_obj, lifetime=_refresh_token_lifetime())
+    return json_response(schemas.Token, _issue_tokens(user_obj.username, family.id, family.generation))
+
+async def _upgrade_password_hash(user_id: int, old_hash: str, password: str) -> None:
+    # Skipped while logins are queueing for the hashing pool; the user's next login retries.
+    if not password_hashing_pool.has_idle_worker():
+        return
+    try:
+        async with AsyncSessionLocal() as db: # The request's session is closed by now
+            await crud.upgrade_password_hash(db, user_id, old_hash, password)
+    except (PasswordHashingUnavailable, SQLAlchemyError) as e:
+        logger.warning("Password re-hash for user %s skipped: %s", user_id, e)
+
+def _refresh_token_lifetime() -> timedelta:
+    return timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+
+def _issue_tokens(username: str, family_id: str, generation: int) -> dict:
+    access_token = create_access_token(data={"sub": username})
+    refresh_token = create_refresh_token(data={"sub": username, "fam": family_id, "gen": generation})
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(request_data: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Exchanges a refresh token for a new access/refresh pair (rotation).
+    Costs one signature check and one indexed UPDATE; no password verification.
+    Reusing an already-exchanged refresh token revokes the whole session family.
+    """
+    payload = decode_token(request_data.refresh_token)
+    if (
+        payload is None
+        or payload.get("type") != REFRESH_TOKEN_TYPE
+        or not isinstance(payload.get("fam"), str)
+        or not isinstance(payload.get("gen"), int)
+        or not payload.get("sub")
+    ):
+        raise InvalidTokenException()
+
+    user_id = await crud.rotate_refresh_token_family(
+        db, family_id=payload["fam"], generation=payload["gen"], lifetime=_refresh_token_lifetime()
+    )
+    if user_id is None:
+        raise InvalidTokenException(detail="Refresh token is invalid, expired or has been revoked.")
+
+    user_obj = await get_principal(db, payload["sub"])
+    if user_obj is None or user_obj.id != user_id or not user_obj.is_active or is_token_revoked(payload, user_obj):
+        await crud.revoke_refresh_token_family(db, payload["fam"])
+        raise InvalidTokenException(detail="Refresh token is invalid, expired or has been revoked.")
+    return json_response(schemas.Token, _issue_tokens(user_obj.username, payload["fam"], payload["gen"] + 1))
+
+@router.post("/logout", response_model=schemas.MessageSchema)
+async def logout(
+    request_data: Optional[schemas.LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Revokes the presented access token and, if given, the refresh token and its session.
+    Both stay rejected until they would have expired anyway.
+    """
+    payloads = [decode_token(token)] # Already verified by get_current_user
+    family_id = None
+    if request_data is not None and request_data.refresh_token:
+        payload = decode_token(request_data.refresh_token)
+        if payload is None or payload.get("type") != REFRESH_TOKEN_TYPE or payload.get("sub") != current_user.username:
+            raise InvalidTokenException()
+        payloads.append(payload)
+        if isinstance(payload.get("fam"), str):
+            family_id = payload["fam"]
+    await crud.revoke_tokens(db, payloads, family_id=family_id) # One transaction
+    return json_response(schemas.MessageSchema, {"message": "Logged out."})
+
+# Browsers may keep /me but must revalidate it; the response depends on the bearer token.
+ME_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+# Part of every user ETag, so a change to the UserRead fields invalidates cached copies.
+_USER_READ_FIELDS = ",".join(schemas.UserRead.model_fields)
+
+def user_etag(user: models.User) -> str:
+    """
+    Strong ETag of a user's UserRead representation: id and updated_at, plus a short
+    digest of the other exposed fields. SQLite stores updated_at with one-second
+    resolution, so two writes within a second must still change the tag.
+    """
+    digest = hashlib.blake2b(
+        repr((_USER_READ_FIELDS, user.username, user.email, user.is_active, user.is_verified_email,
+              user.created_at)).encode(),
+        digest_size=8,
+    ).hexdigest()
+    updated = user.updated_at.strftime("%Y%m%d%H%M%S%f") if user.updated_at else "0"
+    return f'"{user.id}-{updated}-{digest}"'
+
 @router.get("/me", response_model=schemas.UserRead) # Optional removed from response_model as it should always return user or raise error
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
-    return current_user
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: models.User = Depends(get_current_active_user),
+):
+    # With a cached principal, a revalidation is answered without a query or serialization
+    headers = {"ETag": user_etag(current_user), **ME_CACHE_HEADERS}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers) # Used when FAST_JSON_RESPONSES is off
+    return json_response(schemas.UserRead, current_user, headers=headers)
 
 # --- New Endpoints for Email Verification and Password Reset ---
 
 @router.post("/request-email-verification", response_model=schemas.MessageSchema, status_code=status.HTTP_200_OK)
 async def request_email_verification(
     user_email_schema: schemas.RequestEmailVerificationSchema,
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: AsyncSession = Depends(get_db),
 ):
-    user = crud.get_user_by_email(db, email=user_email_schema.email)
+    user = await crud.get_user_by_email(db, email=user_email_schema.email)
     if not user:
         # To prevent user enumeration, return a generic success message.
         # Log this event for monitoring if desired.
-        return {"message": "If an account with this email exists and requires verification, a new link has been sent."}
+        return json_response(schemas.MessageSchema, {"message": "If an account with this email exists and requires verification, a new link has been sent."})
 
     if user.is_verified_email:
         # Option 1: Inform user (might lead to enumeration if error is different)
@@ -99,58 +217,41 @@ async def request_email_verification(
         # Option 3: Generic message like above
         pass # Allowing re-send for now
 
-    updated_user = crud.set_email_verification_token(db, user=user)
-    if not updated_user.email_verification_token:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not generate verification token.")
-
-    background_tasks.add_task(
-        send_email_verification_email,
-        recipient_email=updated_user.email,
-        username=updated_user.username,
-        token=updated_user.email_verification_token
-    )
-    return {"message": "If your email is registered and requires verification, a new verification link has been sent."}
+    await crud.set_email_verification_token(db, user=user)
+    return json_response(schemas.MessageSchema, {"message": "If your email is registered and requires verification, a new verification link has been sent."})
 
 
 @router.get("/verify-email/{token}", response_model=schemas.MessageSchema, status_code=status.HTTP_200_OK)
-async def verify_email(token: str, db: Session = Depends(get_db)):
-    user = crud.verify_user_by_email_token(db, token=token)
+async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
+    user = await crud.verify_user_by_email_token(db, token=token)
     if not user:
         raise EmailVerificationTokenInvalid() # Custom exception
-    return {"message": "Email verified successfully."}
+    return json_response(schemas.MessageSchema, {"message": "Email verified successfully."})
 
 
 @router.post("/request-password-reset", response_model=schemas.MessageSchema, status_code=status.HTTP_200_OK)
 async def request_password_reset(
     request_data: schemas.RequestPasswordResetSchema,
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: AsyncSession = Depends(get_db),
 ):
-    user = crud.get_user_by_email(db, email=request_data.email)
+    # From the primary: the reset token is bound to this row's state, and redeeming it
+    # compares against the primary
+    user = await crud.get_user_by_email(db, email=request_data.email, replica=False)
     if user: # Only proceed if user exists
-        updated_user = crud.set_password_reset_token(db, user=user)
-        if not updated_user.password_reset_token: # Should ideally not happen
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not generate password reset token.")
-
-        background_tasks.add_task(
-            send_password_reset_email,
-            recipient_email=updated_user.email,
-            username=updated_user.username,
-            token=updated_user.password_reset_token
-        )
+        await crud.set_password_reset_token(db, user=user)
     # Always return a generic message to prevent user enumeration
-    return {"message": "If an account with that email exists, a password reset link has been sent."}
+    return json_response(schemas.MessageSchema, {"message": "If an account with that email exists, a password reset link has been sent."})
 
 
 @router.post("/reset-password", response_model=schemas.MessageSchema, status_code=status.HTTP_200_OK)
 async def reset_password(
     request_data: schemas.ResetPasswordSchema, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = crud.get_user_by_password_reset_token(db, token=request_data.token)
+    user = await crud.get_user_by_password_reset_token(db, token=request_data.token)
     if not user:
         # This handles expired or invalid tokens via get_user_by_password_reset_token's logic
         raise PasswordResetTokenInvalid() # Custom exception
 
-    crud.reset_user_password(db, user=user, new_password=request_data.new_password)
-    return {"message": "Password has been reset successfully."}
+    await crud.reset_user_password(db, user=user, new_password=request_data.new_password)
+    return json_response(schemas.MessageSchema, {"message": "Password has been reset successfully."})
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from datetime import datetime
-from typing import Optional # Optional was used in the original based on subtask report
+import re
+from typing import List, Optional # Optional was used in the original based on subtask report
 
 # User Schemas
 class UserBase(BaseModel):
@@ -30,12 +31,28 @@ class UserRead(UserBase):
     # class Config:
     #     orm_mode = True
 
+class UserAdminRead(UserRead):
+    is_superuser: bool = False
+
+class UserPage(BaseModel):
+    items: List[UserAdminRead]
+    next_cursor: Optional[str] = None # Pass as ?cursor= for the next page; None on the last page
+
 # Token Schemas
 class Token(BaseModel):
     access_token: str
     refresh_token: str # Added refresh_token as per original plan
     token_type: str = "bearer"
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None # Also ends the refresh session when given
+
+class TokenRevokeRequest(BaseModel):
+    token: str # An access or refresh token to deny until its expiry
+
 class TokenData(BaseModel):
     username: Optional[str] = None # Or user_id: Optional[int] = None
 
@@ -44,6 +61,11 @@ class LoginCredentials(BaseModel):
     username: str
     password: str
 
+class AvailabilityResponse(BaseModel):
+    # None for a field that was not asked about
+    username_available: Optional[bool] = None
+    email_available: Optional[bool] = None
+
 # Password Reset and Email Verification Schemas
 class RequestPasswordResetSchema(BaseModel):
     email: EmailStr
@@ -57,3 +79,52 @@ class RequestEmailVerificationSchema(BaseModel):
 
 class MessageSchema(BaseModel): # Generic message response
     message: str
+
+
+# Bulk Import Schemas
+# Modular Crypt Format bcrypt hash ($2a$/$2b$/$2y$, two-digit cost, 53 chars of salt + digest)
+BCRYPT_HASH_PATTERN = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+class UserImportRow(BaseModel):
+    """One CSV/NDJSON record. Exactly one of password / hashed_password (bcrypt) is required."""
+    username: str
+    email: EmailStr
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    is_active: bool = True
+    is_verified_email: bool = False
+    is_superuser: bool = False
+
+    @field_validator("password", "hashed_password", mode="before")
+    @classmethod
+    def _blank_to_none(cls, value):
+        # Empty CSV cells mean "not provided"
+        return value or None
+
+    @field_validator("hashed_password")
+    @classmethod
+    def _check_bcrypt(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and not BCRYPT_HASH_PATTERN.match(value):
+            raise ValueError("hashed_password must be a bcrypt hash")
+        return value
+
+    @model_validator(mode="after")
+    def _one_secret(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Provide exactly one of password or hashed_password")
+        return self
+
+class BulkImportRowError(BaseModel):
+    line: int # 1-based record number in the input (the CSV header is line 1)
+    username: Optional[str] = None
+    error: str
+
+class BulkImportReport(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[BulkImportRowError] = []
+    errors_truncated: bool = False # More errors than BULK_IMPORT_MAX_REPORTED_ERRORS
@@ -0,0 +1,83 @@
+# backend/benchmarks/bloom_filter_benchmark.py
+"""
+Measures app.core.bloom.BloomFilter as used by the availability filter: build time,
+memory, lookup cost and the observed false-positive rate at a given entry count.
+
+Run from backend/ (10M entries takes about a minute and a half of pure-Python hashing):
+
+    python -m benchmarks.bloom_filter_benchmark --entries 10000000 --error-rate 0.01
+    python -m benchmarks.bloom_filter_benchmark --entries 1000000 --probes 200000 --json
+
+Entries look like the real keys ("u:user123", "e:user123@example.com"); probes are keys
+that were never added, so every hit is a false positive. For comparison the report
+estimates what a Python set holding the same strings would take.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict
+
+from app.core.bloom import BloomFilter
+
+
+def _entry(i: int) -> str:
+    # Half usernames, half emails, as AvailabilityIndex stores them
+    return f"u:user{i // 2}" if i % 2 == 0 else f"e:user{i // 2}@example.com"
+
+
+def _estimated_set_bytes(entries: int, sample: int = 10000) -> int:
+    sample = min(sample, entries)
+    avg_str = sum(sys.getsizeof(_entry(i)) for i in range(sample)) / sample
+    # CPython sets keep a hash table of (hash, pointer) slots, at most ~60% full
+    table = 16 * entries / 0.6
+    return int(entries * avg_str + table)
+
+
+def run(entries: int, error_rate: float, probes: int) -> Dict:
+    started = time.perf_counter()
+    bloom = BloomFilter(entries, error_rate)
+    for i in range(entries):
+        bloom.add(_entry(i))
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    false_positives = sum(1 for i in range(probes) if f"u:absent{i}" in bloom)
+    probe_seconds = time.perf_counter() - started
+
+    stats = bloom.stats()
+    return {
+        "entries": entries,
+        "target_false_positive_rate": error_rate,
+        "measured_false_positive_rate": round(false_positives / probes, 6) if probes else None,
+        "estimated_false_positive_rate": stats["estimated_false_positive_rate"],
+        "num_hashes": stats["num_hashes"],
+        "filter_bytes": stats["size_bytes"],
+        "filter_mib": round(stats["size_bytes"] / 2 ** 20, 2),
+        "bits_per_entry": round(stats["num_bits"] / entries, 2),
+        "estimated_python_set_mib": round(_estimated_set_bytes(entries) / 2 ** 20, 1),
+        "build_seconds": round(build_seconds, 2),
+        "adds_per_second": round(entries / build_seconds),
+        "lookup_us": round(probe_seconds / probes * 1e6, 2) if probes else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10_000_000)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--probes", type=int, default=1_000_000, help="Lookups of absent keys")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    result = run(args.entries, args.error_rate, args.probes)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    width = max(len(k) for k in result)
+    for key, value in result.items():
+        print(f"{key:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
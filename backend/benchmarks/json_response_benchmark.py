@@ -0,0 +1,204 @@
+# backend/benchmarks/json_response_benchmark.py
+"""
+CPU cost of serializing the /auth responses: FastAPI's default response_model path
+versus app/core/responses.py (FAST_JSON_RESPONSES).
+
+1. serialize: per-call CPU of turning a handler's return value into response bytes,
+   for GET /auth/me (an ORM User as UserRead) and POST /auth/login (the token dict as
+   Token). The default path is fastapi.routing.serialize_response plus JSONResponse,
+   exactly as the route would run it.
+2. requests: event-loop thread CPU per request for /auth/me and /auth/login, served
+   in-process through httpx's ASGI transport. Each mode runs in a fresh process with
+   FAST_JSON_RESPONSES=False or True on a temporary SQLite database. bcrypt runs on
+   the hashing pool's threads, so it is not counted. Both modes must return the same
+   JSON documents, which the benchmark checks.
+
+Run from backend/:
+
+    python -m benchmarks.json_response_benchmark
+    python -m benchmarks.json_response_benchmark --iterations 50000 --requests 2000 --logins 100 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+API = "/api/v1/auth"
+PASSWORD = "Bench-password-1"
+
+
+def _cpu_per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    for _ in range(min(1000, iterations)): # Warm-up: adapters, caches
+        fn()
+    started = time.thread_time()
+    for _ in range(iterations):
+        fn()
+    return (time.thread_time() - started) / iterations * 1e6
+
+
+def bench_serialize(iterations: int) -> Dict[str, Dict[str, float]]:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    from app.core.responses import FastJSONResponse, encode
+    from app.users import models, schemas
+    from app.users.router import router
+
+    fields = {route.path: route.response_field for route in router.routes}
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    user = models.User(
+        id=42, username="bench_user", email="bench_user@example.com", hashed_password="x" * 60,
+        is_active=True, is_superuser=False, is_verified_email=True, created_at=now, updated_at=now,
+    )
+    tokens = {"access_token": "a" * 180, "refresh_token": "r" * 220, "token_type": "bearer"}
+    loop = asyncio.new_event_loop()
+
+    def default_path(path: str, content: Any) -> Callable[[], Any]:
+        field = fields[f"{router.prefix}{path}"]
+        return lambda: JSONResponse(
+            loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        ).body
+
+    async def noop():
+        return None
+
+    results = {}
+    try:
+        # run_until_complete's own cost is measured separately and subtracted
+        loop_overhead = _cpu_per_call_us(lambda: loop.run_until_complete(noop()), iterations)
+        for name, path, model, content in (
+            ("me", "/me", schemas.UserRead, user),
+            ("login", "/login", schemas.Token, tokens),
+        ):
+            default_us = _cpu_per_call_us(default_path(path, content), iterations) - loop_overhead
+            fast_us = _cpu_per_call_us(lambda: FastJSONResponse(encode(model, content)).body, iterations)
+            results[name] = {
+                "default_us": round(default_us, 2),
+                "fast_us": round(fast_us, 2),
+                "saved_us": round(default_us - fast_us, 2),
+                "speedup": round(default_us / fast_us, 2) if fast_us else 0.0,
+            }
+    finally:
+        loop.close()
+    return results
+
+
+async def _child(requests: int, logins: int) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post(API + "/register", json={
+                "username": "bench_user", "email": "bench_user@example.com", "password": PASSWORD,
+            })
+            register_body = response.json()
+            login = {"username": "bench_user", "password": PASSWORD}
+            token = (await client.post(API + "/login", json=login)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            me_body = (await client.get(API + "/me", headers=headers)).json()
+
+            results = {"documents": {"register": register_body, "me": me_body}}
+            for name, count, send in (
+                ("me", requests, lambda: client.get(API + "/me", headers=headers)),
+                ("login", logins, lambda: client.post(API + "/login", json=login)),
+            ):
+                await send() # Warm-up
+                cpu_started, wall_started = time.thread_time(), time.perf_counter()
+                for _ in range(count):
+                    response = await send()
+                    if response.status_code != 200:
+                        raise SystemExit(f"{name}: HTTP {response.status_code} {response.text}")
+                results[name] = {
+                    "requests": count,
+                    "loop_cpu_us": round((time.thread_time() - cpu_started) / count * 1e6, 1),
+                    "wall_ms": round((time.perf_counter() - wall_started) / count * 1000, 3),
+                }
+            return results
+    finally:
+        await app.router.shutdown()
+
+
+def bench_requests(requests: int, logins: int) -> Dict[str, Any]:
+    from benchmarks.auth_load_benchmark import BENCH_ENV
+
+    modes = {}
+    for mode, enabled in (("default", "False"), ("fast", "True")):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, **BENCH_ENV)
+            env.update(
+                FAST_JSON_RESPONSES=enabled,
+                DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+            )
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.json_response_benchmark", "--child",
+                 "--requests", str(requests), "--logins", str(logins)],
+                env=env, capture_output=True, text=True, check=False,
+            )
+        if result.returncode != 0:
+            raise SystemExit(f"{mode} run failed:\n{result.stderr[-2000:]}")
+        modes[mode] = json.loads(result.stdout.strip().splitlines()[-1])
+
+    for document in ("register", "me"):
+        default_doc, fast_doc = (modes[m]["documents"][document] for m in ("default", "fast"))
+        for doc in (default_doc, fast_doc): # Timestamps differ between the two databases
+            doc.pop("created_at"), doc.pop("updated_at")
+        if default_doc != fast_doc:
+            raise SystemExit(f"{document} responses differ:\n  default {default_doc}\n  fast    {fast_doc}")
+
+    return {
+        name: {
+            "default_loop_cpu_us": modes["default"][name]["loop_cpu_us"],
+            "fast_loop_cpu_us": modes["fast"][name]["loop_cpu_us"],
+            "saved_us": round(modes["default"][name]["loop_cpu_us"] - modes["fast"][name]["loop_cpu_us"], 1),
+            "default_wall_ms": modes["default"][name]["wall_ms"],
+            "fast_wall_ms": modes["fast"][name]["wall_ms"],
+        }
+        for name in ("me", "login")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="Serializations per case")
+    parser.add_argument("--requests", type=int, default=1000, help="GET /auth/me requests per mode")
+    parser.add_argument("--logins", type=int, default=50, help="POST /auth/login requests per mode (bcrypt-bound)")
+    parser.add_argument("--skip-requests", action="store_true", help="Only run the serialization benchmark")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args.requests, args.logins))))
+        return
+
+    report = {"serialize": bench_serialize(args.iterations)}
+    if not args.skip_requests:
+        report["requests"] = bench_requests(args.requests, args.logins)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'serialize':<12}{'default us':>12}{'fast us':>10}{'saved us':>10}{'speedup':>9}")
+    for name, r in report["serialize"].items():
+        print(f"{name:<12}{r['default_us']:>12.2f}{r['fast_us']:>10.2f}{r['saved_us']:>10.2f}{r['speedup']:>8.2f}x")
+    if "requests" in report:
+        print(f"\n{'request':<12}{'default cpu us':>16}{'fast cpu us':>13}{'saved us':>10}"
+              f"{'default ms':>12}{'fast ms':>9}")
+        for name, r in report["requests"].items():
+            print(f"{name:<12}{r['default_loop_cpu_us']:>16.1f}{r['fast_loop_cpu_us']:>13.1f}{r['saved_us']:>10.1f}"
+                  f"{r['default_wall_ms']:>12.3f}{r['fast_wall_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# backend/benchmarks/security_benchmark.py
+"""
+Microbenchmark and regression gate for the app/core/security primitives that bound
+auth throughput: get_password_hash, verify_password, create_access_token,
+create_refresh_token and decode_token (uncached and cache hit).
+
+Each primitive is called from 1..N threads at once (--threads 1,2,4) for --seconds
+per level, recording ops/sec and the per-call latency distribution. With a baseline,
+every (primitive, threads) cell is compared against it, and the process exits with
+status 1 if throughput dropped or p95 latency rose by more than the allowed fraction.
+
+Run from backend/ on the machine that runs the gate (baselines are hardware-specific):
+
+    python -m benchmarks.security_benchmark --save-baseline benchmarks/security_baseline.json
+    python -m benchmarks.security_benchmark --baseline benchmarks/security_baseline.json
+    python -m benchmarks.security_benchmark --baseline b.json --max-regression 0.15 \\
+        --threshold verify_password=0.30 --threshold get_password_hash=0.30
+
+A bcrypt cost change shows up as a regression on purpose; re-save the baseline
+when the new cost is intended.
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+# Imported lazily in main() so --help works without the app's settings.
+security = None
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def _primitives() -> Dict[str, Callable[[], Any]]:
+    password = "Bench-password-1"
+    hashed = security.get_password_hash(password)
+    claims = {"sub": "bench-user"}
+    access_token = security.create_access_token(claims)
+    return {
+        "get_password_hash": lambda: security.get_password_hash(password),
+        "verify_password": lambda: security.verify_password(password, hashed),
+        "create_access_token": lambda: security.create_access_token(claims),
+        "create_refresh_token": lambda: security.create_refresh_token({**claims, "fam": "bench", "gen": 0}),
+        # The signature/claims check that decode_token performs on a cache miss
+        "decode_token": lambda: security._decode_jwt(access_token),
+        "decode_token_cached": lambda: security.decode_token(access_token),
+    }
+
+
+def measure(fn: Callable[[], Any], threads: int, seconds: float) -> Dict[str, Any]:
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    start_barrier = threading.Barrier(threads + 1)
+    deadline = [0.0]
+
+    def worker(samples: List[float]) -> None:
+        start_barrier.wait()
+        clock = time.perf_counter
+        while True:
+            started = clock()
+            if started >= deadline[0]:
+                return
+            fn()
+            samples.append(clock() - started)
+
+    workers = [threading.Thread(target=worker, args=(latencies[i],)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    deadline[0] = time.perf_counter() + seconds
+    started = time.perf_counter()
+    start_barrier.wait()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [s for per_thread in latencies for s in per_thread]
+    return {
+        "ops": len(samples),
+        "ops_per_sec": round(len(samples) / elapsed, 1),
+        "p50_us": round(_percentile(samples, 50) * 1e6, 1),
+        "p95_us": round(_percentile(samples, 95) * 1e6, 1),
+        "p99_us": round(_percentile(samples, 99) * 1e6, 1),
+    }
+
+
+def run(thread_levels: List[int], seconds: float, only: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, fn in _primitives().items():
+        if only and name not in only:
+            continue
+        fn() # Warm up (imports, key loading, backend selection)
+        results[name] = {str(t): measure(fn, t, seconds) for t in thread_levels}
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "jwt_algorithm": security.settings_to_use.JWT_ALGORITHM,
+            "bcrypt_rounds": security.get_pwd_context().handler("bcrypt").default_rounds,
+            "seconds": seconds,
+        },
+        "results": results,
+    }
+
+
+def check(current: Dict[str, Any], baseline: Dict[str, Any], default_threshold: float,
+          thresholds: Dict[str, float]) -> List[Tuple[str, str, str]]:
+    """Returns (primitive, threads, reason) for every cell slower than the baseline allows."""
+    failures = []
+    for name, levels in current["results"].items():
+        allowed = thresholds.get(name, default_threshold)
+        for threads, now in levels.items():
+            before = baseline.get("results", {}).get(name, {}).get(threads)
+            if not before:
+                continue
+            if now["ops_per_sec"] < before["ops_per_sec"] * (1 - allowed):
+                failures.append((name, threads, f"ops/sec {before['ops_per_sec']} -> {now['ops_per_sec']} "
+                                 f"({(now['ops_per_sec'] / before['ops_per_sec'] - 1) * 100:+.1f}%, budget -{allowed:.0%})"))
+            if before["p95_us"] and now["p95_us"] > before["p95_us"] * (1 + allowed):
+                failures.append((name, threads, f"p95 {before['p95_us']}us -> {now['p95_us']}us "
+                                 f"({(now['p95_us'] / before['p95_us'] - 1) * 100:+.1f}%, budget +{allowed:.0%})"))
+    return failures
+
+
+def print_report(result: Dict[str, Any], baseline: Dict[str, Any] = None) -> None:
+    meta = result["meta"]
+    print(f"jwt={meta['jwt_algorithm']} bcrypt_rounds={meta['bcrypt_rounds']} python={meta['python']}")
+    print(f"{'primitive':<22}{'threads':>8}{'ops/s':>12}{'p50 us':>11}{'p95 us':>11}{'p99 us':>11}{'vs base':>9}")
+    for name, levels in result["results"].items():
+        for threads, r in levels.items():
+            delta = ""
+            before = (baseline or {}).get("results", {}).get(name, {}).get(threads)
+            if before and before["ops_per_sec"]:
+                delta = f"{(r['ops_per_sec'] / before['ops_per_sec'] - 1) * 100:+.1f}%"
+            print(f"{name:<22}{threads:>8}{r['ops_per_sec']:>12}{r['p50_us']:>11}{r['p95_us']:>11}{r['p99_us']:>11}{delta:>9}")
+
+
+def main() -> None:
+    global security
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Measurement time per primitive and level")
+    parser.add_argument("--only", action="append", default=[], help="Benchmark only this primitive (repeatable)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; regressions exit with status 1")
+    parser.add_argument("--save-baseline", help="Write this run's results as the new baseline")
+    parser.add_argument("--output", help="Also write this run's results here")
+    parser.add_argument("--max-regression", type=float, default=0.20,
+                        help="Allowed fractional slowdown (ops/sec drop or p95 rise), default 0.20")
+    parser.add_argument("--threshold", action="append", default=[], metavar="PRIMITIVE=FRACTION",
+                        help="Per-primitive override of --max-regression")
+    args = parser.parse_args()
+
+    from app.core import security as security_module
+    security = security_module
+
+    thresholds = {}
+    for item in args.threshold:
+        name, _, value = item.partition("=")
+        thresholds[name] = float(value)
+    levels = [int(t) for t in args.threads.split(",") if t.strip()]
+
+    result = run(levels, args.seconds, args.only)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"Saved {path}")
+
+    if baseline is None:
+        return
+    if baseline["meta"].get("bcrypt_rounds") != result["meta"]["bcrypt_rounds"]:
+        print(f"NOTE: bcrypt rounds changed {baseline['meta'].get('bcrypt_rounds')} -> {result['meta']['bcrypt_rounds']}")
+    failures = check(result, baseline, args.max_regression, thresholds)
+    if failures:
+        print("\nREGRESSION: security primitives slower than the baseline allows:", file=sys.stderr)
+        for name, threads, reason in failures:
+            print(f"  {name} @ {threads} thread(s): {reason}", file=sys.stderr)
+        sys.exit(1)
+    print("OK: no primitive regressed past its budget")
+
+
+if __name__ == "__main__":
+    main()
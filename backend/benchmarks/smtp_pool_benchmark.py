@@ -0,0 +1,135 @@
+# backend/benchmarks/smtp_pool_benchmark.py
+"""
+Throughput of app.core.smtp_pool.SMTPConnectionPool against a local stand-in SMTP server.
+
+Compares:
+  - per-message connections (what FastMail does: connect + EHLO + AUTH + send + QUIT each time)
+  - the pool at one or more sizes (handshake once per connection, many messages per connection)
+
+Requires the dev-only package aiosmtpd (pip install aiosmtpd). Run from backend/:
+
+    python -m benchmarks.smtp_pool_benchmark --messages 500 --pool-sizes 1,4,8 --handshake-latency-ms 20
+
+--handshake-latency-ms delays the server's EHLO reply to stand in for the round trips
+and TLS negotiation of a remote SMTP server; 0 measures pure local overhead.
+"""
+import argparse
+import asyncio
+import json
+import socket
+import time
+from typing import Dict, List
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError: # pragma: no cover - dev-only dependency
+    raise SystemExit("This benchmark needs aiosmtpd: pip install aiosmtpd")
+
+import aiosmtplib
+
+from app.core.smtp_pool import SMTPConnectionPool
+from app.core.email_service import build_email_message
+
+
+class _CountingHandler:
+    def __init__(self, handshake_latency: float):
+        self.handshake_latency = handshake_latency
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.handshake_latency:
+            await asyncio.sleep(self.handshake_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _messages(count: int):
+    return [
+        build_email_message([f"user{i}@example.com"], f"Benchmark message {i}", f"<p>Hello {i}</p>")
+        for i in range(count)
+    ]
+
+
+async def _per_message_connections(port: int, count: int, concurrency: int) -> float:
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def send_one(message):
+        async with limiter:
+            await aiosmtplib.send(message, hostname="127.0.0.1", port=port, start_tls=False)
+
+    messages = _messages(count)
+    started = time.perf_counter()
+    await asyncio.gather(*(send_one(m) for m in messages))
+    return time.perf_counter() - started
+
+
+async def _pooled(port: int, count: int, size: int) -> Dict[str, float]:
+    pool = SMTPConnectionPool(hostname="127.0.0.1", port=port, start_tls=False, size=size,
+                              max_messages_per_connection=0)
+    messages = _messages(count)
+    started = time.perf_counter()
+    errors = await pool.send_many(messages)
+    elapsed = time.perf_counter() - started
+    stats = pool.stats()
+    await pool.close()
+    failed = sum(1 for e in errors if e is not None)
+    return {"elapsed": elapsed, "failed": failed, "connections": stats["connections_opened"]}
+
+
+async def run(messages: int, pool_sizes: List[int], handshake_latency_ms: float) -> List[Dict]:
+    handler = _CountingHandler(handshake_latency_ms / 1000.0)
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    results = []
+    try:
+        for size in pool_sizes:
+            elapsed = await _per_message_connections(port, messages, concurrency=size)
+            results.append({
+                "mode": "connection-per-message", "concurrency": size, "messages": messages,
+                "seconds": round(elapsed, 4), "msgs_per_sec": round(messages / elapsed, 1),
+                "msgs_per_sec_per_connection": round(messages / elapsed / size, 1),
+            })
+            pooled = await _pooled(port, messages, size)
+            results.append({
+                "mode": "pooled", "concurrency": size, "messages": messages,
+                "seconds": round(pooled["elapsed"], 4), "msgs_per_sec": round(messages / pooled["elapsed"], 1),
+                "msgs_per_sec_per_connection": round(messages / pooled["elapsed"] / size, 1),
+                "connections_opened": pooled["connections"], "failed": pooled["failed"],
+            })
+    finally:
+        controller.stop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--pool-sizes", default="1,4", help="Comma-separated pool sizes / concurrency levels")
+    parser.add_argument("--handshake-latency-ms", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.pool_sizes.split(",") if s.strip()]
+    results = asyncio.run(run(args.messages, sizes, args.handshake_latency_ms))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<24}{'conns':>6}{'msgs':>7}{'seconds':>10}{'msg/s':>10}{'msg/s/conn':>12}")
+    for r in results:
+        print(f"{r['mode']:<24}{r['concurrency']:>6}{r['messages']:>7}{r['seconds']:>10}"
+              f"{r['msgs_per_sec']:>10}{r['msgs_per_sec_per_connection']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# backend/benchmarks/startup_profile.py
+"""
+Import-time and startup-time profile of the API, i.e. how long a fresh worker
+process needs before it can take traffic.
+
+Each measurement runs in a new interpreter, so nothing is already imported:
+
+1. `python -X importtime -c "import app.main"`: the modules with the largest self
+   import time, and the app's own modules with cumulative and self time.
+2. Importing app.main, then running the startup and shutdown hooks (schema
+   handling per DB_SCHEMA_STARTUP, background tasks).
+
+Run from backend/:
+
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --env DB_SCHEMA_STARTUP=check --budget-ms 1000
+    python -m benchmarks.startup_profile --env DATABASE_URL=sqlite:////tmp/app.db --json
+
+With --budget-ms the process exits with status 1 when import plus startup takes longer.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+_STARTUP_SNIPPET = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def main():
+    hooks_started = time.perf_counter()
+    try:
+        await app.main.app.router.startup()
+        hooks_finished = time.perf_counter()
+    finally:
+        await app.main.app.router.shutdown() # Also after a failed startup, to release the engines
+    return hooks_finished - hooks_started, time.perf_counter() - hooks_finished
+
+startup, shutdown = asyncio.run(main())
+print(json.dumps({
+    "import_ms": round((imported - started) * 1000, 1),
+    "startup_hooks_ms": round(startup * 1000, 1),
+    "shutdown_hooks_ms": round(shutdown * 1000, 1),
+}))
+"""
+
+
+def _run(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=False)
+
+
+def profile_imports(env: Dict[str, str], top: int) -> Dict:
+    result = _run(["-X", "importtime", "-c", "import app.main"], env)
+    if result.returncode != 0:
+        raise SystemExit(f"import app.main failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    top_level = [m for m in modules if m["depth"] == 0]
+    return {
+        "total_import_ms": round(sum(m["cumulative_ms"] for m in top_level), 1),
+        "modules_imported": len(modules),
+        "slowest": sorted(modules, key=lambda m: m["self_ms"], reverse=True)[:top],
+        "app_modules": sorted(
+            (m for m in modules if m["module"] == "app" or m["module"].startswith("app.")),
+            key=lambda m: m["cumulative_ms"], reverse=True,
+        ),
+    }
+
+
+def profile_startup(env: Dict[str, str]) -> Dict:
+    result = _run(["-c", _STARTUP_SNIPPET], env)
+    if result.returncode != 0:
+        raise SystemExit(f"Startup failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the profiled process (repeatable)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules (by self time) to list")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--budget-ms", type=float, help="Fail if import + startup hooks exceed this")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    imports = profile_imports(env, args.top)
+    startup = profile_startup(env)
+    ready_ms = round(startup["import_ms"] + startup["startup_hooks_ms"], 1)
+    report = {"ready_ms": ready_ms, "startup": startup, "imports": imports}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"ready in {ready_ms} ms: import app.main {startup['import_ms']} ms, "
+              f"startup hooks {startup['startup_hooks_ms']} ms (shutdown {startup['shutdown_hooks_ms']} ms)")
+        print(f"\n-X importtime total {imports['total_import_ms']} ms over {imports['modules_imported']} modules")
+        print(f"\n{'slowest modules':<48}{'self ms':>14}")
+        for m in imports["slowest"]:
+            print(f"{m['module']:<48}{m['self_ms']:>14.1f}")
+        print(f"\n{'app modules':<48}{'cumulative ms':>14}{'self ms':>10}")
+        for m in imports["app_modules"]:
+            print(f"{m['module']:<48}{m['cumulative_ms']:>14.1f}{m['self_ms']:>10.1f}")
+
+    if args.budget_ms is not None and ready_ms > args.budget_ms:
+        print(f"\nOVER BUDGET: ready in {ready_ms} ms, budget {args.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()